@@ -358,11 +358,11 @@ def add_waste_info_to_multicultural_db():
     # 기존 문서와 새 문서 합치기
     if vector_db.documents is None:
         vector_db.documents = []
-    if vector_db.doc_embeddings is None:
-        vector_db.doc_embeddings = []
     
     vector_db.documents.extend(new_documents)
-    vector_db.doc_embeddings.extend(new_embeddings)
+    # doc_embeddings는 정규화된 행렬이므로 새 임베딩을 붙인 뒤 다시 설정
+    old_embeddings = [] if vector_db.doc_embeddings is None else list(vector_db.doc_embeddings)
+    vector_db.doc_embeddings = old_embeddings + new_embeddings
     vector_db.embeddings = embeddings_model
     
     # 백업 파일 생성
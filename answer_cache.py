@@ -0,0 +1,172 @@
+"""
+RAG 답변 캐시
+(채팅방 종류, 답변 언어, 구군) 별로 답변을 보관하고,
+정규화된 질문이 같거나 질문 임베딩이 충분히 비슷하면 Gemini 호출 없이 답변을 재사용합니다.
+벡터DB 내용 해시가 바뀌면 이전 답변은 사용하지 않습니다.
+
+방 ID는 키에 넣지 않습니다. 답변은 채팅방 종류별 공용 벡터DB와 질문(구군이 정해진 경우 구군 포함)만으로
+만들어지므로, 같은 종류의 방들은 같은 질문/비슷한 질문에 대한 답변을 서로 재사용합니다.
+방마다 다른 대화 맥락은 질문에 합쳐진 뒤(예: "해운대구에서 ...") 키가 되므로 섞이지 않습니다.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from embedding_cache import normalize_query
+
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1000"))
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", str(6 * 60 * 60)))  # 초
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))
+
+
+def _unit_vector(embedding):
+    if embedding is None:
+        return None
+    vec = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else None
+
+
+class AnswerCache:
+    def __init__(self, max_size=ANSWER_CACHE_SIZE, ttl=ANSWER_CACHE_TTL, similarity_threshold=ANSWER_CACHE_SIMILARITY):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        # (room_type, lang, district, 정규화 질문) -> 항목
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.saved_seconds = 0.0
+
+    def get(self, room_type, lang, district, query, embedding=None, db_hash=None):
+        """캐시된 답변을 반환합니다. 없으면 None. (get_exact 후 get_similar)"""
+        answer = self.get_exact(room_type, lang, district, query, db_hash)
+        if answer is not None:
+            return answer
+        return self.get_similar(room_type, lang, district, embedding, db_hash)
+
+    def get_exact(self, room_type, lang, district, query, db_hash=None):
+        """정규화된 질문이 같은 답변을 반환합니다. 없으면 None. (임베딩 없이 확인 가능)"""
+        key = (room_type, lang, district, normalize_query(query))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not self._is_valid(entry, time.time(), db_hash):
+                return None
+            self._entries.move_to_end(key)
+            self.exact_hits += 1
+            self.saved_seconds += entry["generation_time"]
+            return entry["answer"]
+
+    def get_similar(self, room_type, lang, district, embedding, db_hash=None):
+        """질문 임베딩이 충분히 비슷한 답변을 반환합니다. 없으면 None (미적중으로 집계).
+        유사 질문은 같은 (채팅방 종류, 언어, 구군) 범위 안에서만 찾습니다. (방 ID와는 무관)"""
+        scope = (room_type, lang, district)
+        now = time.time()
+        answer = None
+        with self._lock:
+            query_vec = _unit_vector(embedding)
+            if query_vec is not None:
+                best_key, best_score = None, self.similarity_threshold
+                for other_key, other in self._entries.items():
+                    if other_key[:3] != scope or other["embedding"] is None:
+                        continue
+                    if not self._is_valid(other, now, db_hash):
+                        continue
+                    score = float(np.dot(query_vec, other["embedding"]))
+                    if score >= best_score:
+                        best_key, best_score = other_key, score
+                if best_key is not None:
+                    entry = self._entries[best_key]
+                    self._entries.move_to_end(best_key)
+                    self.semantic_hits += 1
+                    self.saved_seconds += entry["generation_time"]
+                    answer = entry["answer"]
+            if answer is None:
+                self.misses += 1
+        # 로그는 잠금을 푼 뒤에 출력
+        if answer is not None:
+            print(f"  - 유사 질문 답변 캐시 적중 (유사도 {best_score:.3f})")
+        return answer
+
+    def put(self, room_type, lang, district, query, answer, embedding=None, db_hash=None, generation_time=0.0):
+        key = (room_type, lang, district, normalize_query(query))
+        with self._lock:
+            self._entries[key] = {
+                "answer": answer,
+                "embedding": _unit_vector(embedding),
+                "db_hash": db_hash,
+                "created_at": time.time(),
+                "generation_time": generation_time,
+            }
+            self._entries.move_to_end(key)
+            self._evict(time.time())
+
+    def _is_valid(self, entry, now, db_hash):
+        if now - entry["created_at"] > self.ttl:
+            return False
+        return db_hash is None or entry["db_hash"] == db_hash
+
+    def _evict(self, now):
+        # 만료된 항목부터 정리하고, 그래도 크면 가장 오래 안 쓴 항목 제거
+        if len(self._entries) <= self.max_size:
+            return
+        for key in [k for k, e in self._entries.items() if now - e["created_at"] > self.ttl]:
+            del self._entries[key]
+            self.evictions += 1
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, db_hash=None):
+        """db_hash와 다른 벡터DB로 만든 답변을 지웁니다. db_hash가 없으면 전부 지웁니다."""
+        with self._lock:
+            if db_hash is None:
+                removed = len(self._entries)
+                self._entries.clear()
+            else:
+                stale = [k for k, e in self._entries.items() if e["db_hash"] != db_hash]
+                for key in stale:
+                    del self._entries[key]
+                removed = len(stale)
+        return removed
+
+    def get_stats(self):
+        """캐시 적중률과 절약된 생성 시간을 반환합니다."""
+        with self._lock:
+            hits = self.exact_hits + self.semantic_hits
+            total = hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": hits / total if total else 0.0,
+                "evictions": self.evictions,
+                "saved_seconds": round(self.saved_seconds, 2),
+            }
+
+
+# 프로세스 전체에서 공유하는 답변 캐시
+_answer_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_answer_cache():
+    global _answer_cache
+    if _answer_cache is None:
+        with _cache_lock:
+            if _answer_cache is None:
+                _answer_cache = AnswerCache()
+    return _answer_cache
+
+
+def get_answer_cache_stats():
+    return get_answer_cache().get_stats()
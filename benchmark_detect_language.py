@@ -0,0 +1,69 @@
+"""
+detect_language 마이크로 벤치마크
+기존 정규식 기반 감지기와 language_detector.py의 단일 패스 감지기를 비교합니다.
+
+사용법: python benchmark_detect_language.py
+"""
+
+import re
+import timeit
+
+from language_detector import detect_language
+
+
+def legacy_detect_language(text):
+    """기존 rag_utils.detect_language (호출마다 정규식 19개를 컴파일하고 findall)"""
+    patterns = {
+        'ko': r'[가-힣]',
+        'en': r'[a-zA-Z]',
+        'ja': r'[あ-んア-ン]',
+        'zh': r'[一-鿿]',
+        'vi': r'[àáạảãâầấậẩẫăằắặẳẵèéẹẻẽêềếệểễìíịỉĩòóọỏõôồốộổỗơờớợởỡùúụủũưừứựửữỳýỵỷỹđ]',
+        'fr': r'[àâäéèêëïîôöùûüÿç]',
+        'de': r'[äöüß]',
+        'th': r'[฀-๿]',
+        'uz': r'[а-яА-ЯёЁ]',
+        'ne': r'[ऀ-ॿ]',
+        'tet': r'[àáâãäåæçèéêëìíîïñòóôõöùúûüýÿ]',
+        'lo': r'[຀-໿]',
+        'mn': r'[а-яА-ЯёЁ]',
+        'my': r'[က-႟]',
+        'bn': r'[ঀ-৿]',
+        'si': r'[඀-෿]',
+        'km': r'[ក-៿]',
+        'ky': r'[а-яА-ЯёЁ]',
+        'ur': r'[؀-ۿ]',
+    }
+    scores = {lang: len(re.compile(pattern).findall(text)) for lang, pattern in patterns.items()}
+    detected_lang = max(scores, key=scores.get)
+    if scores[detected_lang] == 0:
+        return 'en'
+    return detected_lang
+
+
+SAMPLES = {
+    "ko_short": "음식물 쓰레기 어떻게 버려요?",
+    "ko_long": "해운대구에 살고 있는데 대형 폐기물로 소파와 책상을 버리고 싶어요. 신청은 어디서 하고 비용은 얼마인가요? " * 5,
+    "en": "Where can I get help with my employment contract and unpaid wages?",
+    "vi": "Tôi muốn hỏi về cách vứt rác thực phẩm ở Busan.",
+    "ja": "ゴミの出し方を教えてください",
+    "th": "ฉันจะทิ้งขยะอาหารได้อย่างไร",
+    "uz": "Oziq-ovqat chiqindilarini qayerga tashlash kerak? Ўзбек тилида қандай ёзилади",
+    "mn": "Хүнсний хог хаягдлыг хаана хаях вэ? Өнөөдөр үүнийг асуумаар байна",
+    "ky": "Тамак-аш калдыктарын кайда таштоо керек? Мен бүгүн сураганым келип жатат, аңгеме",
+    "ur": "میں کھانے کا کچرا کہاں پھینکوں؟",
+}
+
+
+def main():
+    number = 2000
+    print(f"{'샘플':<10} {'기존':>6} {'신규':>6} {'기존(µs)':>10} {'신규(µs)':>10} {'배속':>6}")
+    for name, text in SAMPLES.items():
+        legacy_time = timeit.timeit(lambda: legacy_detect_language(text), number=number) / number * 1e6
+        new_time = timeit.timeit(lambda: detect_language(text), number=number) / number * 1e6
+        print(f"{name:<10} {legacy_detect_language(text):>6} {detect_language(text):>6} "
+              f"{legacy_time:>10.1f} {new_time:>10.1f} {legacy_time / new_time:>5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
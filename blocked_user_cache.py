@@ -0,0 +1,175 @@
+"""
+채팅방별 차단 사용자 캐시
+방마다 Firebase 리스너 하나로 rooms/{room_id}/blocked_users를 구독하여
+프로세스 안의 모든 세션이 같은 차단 목록을 공유합니다.
+메시지마다 하는 차단 여부 확인은 네트워크 없이 set 조회로 끝납니다.
+"""
+
+import threading
+import time
+
+from firebase_admin import db
+
+
+BLOCKED_USERS_LOAD_TIMEOUT = 5  # 초, 다른 세션이 목록을 불러오는 중일 때 기다리는 시간
+
+
+class BlockedUserWatch:
+    """watch()가 반환하는 구독 핸들. close()로 구독을 해제합니다."""
+
+    def __init__(self, cache, room_id):
+        self.cache = cache
+        self.room_id = room_id
+        self.closed = False
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.cache.release(self.room_id)
+
+
+class BlockedUserCache:
+    def __init__(self):
+        self._rooms = {}      # room_id -> 차단된 닉네임 set
+        self._listeners = {}  # room_id -> Firebase 리스너
+        self._refs = {}       # room_id -> 구독 중인 세션 수
+        self._loaded = {}     # room_id -> 첫 목록을 불러왔는지 (threading.Event)
+        self._lock = threading.Lock()
+
+    def watch(self, room_id):
+        """방의 차단 목록 구독을 시작하고 핸들을 반환합니다. 이미 구독 중이면 세션 수만 늘립니다.
+        리스너를 붙이기 전에 목록을 한 번 읽어 두므로, 반환된 뒤에는 is_blocked()가 바로 정확합니다."""
+        with self._lock:
+            self._refs[room_id] = self._refs.get(room_id, 0) + 1
+            loaded = self._loaded.get(room_id)
+            is_first = loaded is None
+            if is_first:
+                loaded = self._loaded[room_id] = threading.Event()
+                self._rooms.setdefault(room_id, set())
+                self._listeners[room_id] = None  # 동시에 여러 세션이 구독을 시작하지 않도록 자리 표시
+        handle = BlockedUserWatch(self, room_id)
+        if not is_first:
+            # 먼저 구독한 세션이 목록을 불러오는 중이면 잠시 기다림
+            loaded.wait(BLOCKED_USERS_LOAD_TIMEOUT)
+            return handle
+
+        blocked_ref = db.reference(f'rooms/{room_id}/blocked_users')
+        try:
+            data = blocked_ref.get()
+            with self._lock:
+                if isinstance(data, dict) and self._loaded.get(room_id) is loaded:
+                    self._rooms[room_id].update(data)
+        except Exception as e:
+            print(f"차단 목록 조회 오류: {e}")
+        finally:
+            loaded.set()
+        try:
+            listener = blocked_ref.listen(lambda event: self._on_event(room_id, event))
+            with self._lock:
+                # 그사이 구독이 모두 해제되었다가 다시 시작되었으면 이 리스너는 쓰지 않음
+                if self._loaded.get(room_id) is loaded:
+                    self._listeners[room_id] = listener
+                    listener = None
+            if listener:
+                # 리스너를 붙이는 사이에 모든 세션이 구독을 해제함
+                listener.close()
+        except Exception as e:
+            print(f"차단 목록 리스너 설정 오류: {e}")
+            with self._lock:
+                # 다음 watch()에서 다시 구독을 시도하도록 자리 표시를 지움
+                if self._loaded.get(room_id) is loaded:
+                    self._listeners.pop(room_id, None)
+                    self._loaded.pop(room_id, None)
+        return handle
+
+    def _on_event(self, room_id, event):
+        path_parts = [p for p in (event.path or '').split('/') if p]
+        with self._lock:
+            blocked = self._rooms.get(room_id)
+            if blocked is None:
+                return  # 구독이 해제된 뒤 도착한 이벤트
+            if not path_parts:
+                # 전체 목록 (첫 연결 또는 통째로 덮어쓴 경우)
+                if event.event_type == 'put':
+                    blocked.clear()
+                if isinstance(event.data, dict):
+                    for nickname, value in event.data.items():
+                        if value is None:
+                            blocked.discard(nickname)
+                        else:
+                            blocked.add(nickname)
+            elif event.data is None and len(path_parts) == 1:
+                blocked.discard(path_parts[0])
+            else:
+                blocked.add(path_parts[0])
+
+    def is_blocked(self, room_id, nickname):
+        blocked = self._rooms.get(room_id)
+        return bool(blocked) and nickname in blocked
+
+    def get_blocked(self, room_id):
+        """방의 차단된 닉네임 목록을 반환합니다."""
+        with self._lock:
+            return sorted(self._rooms.get(room_id, ()))
+
+    def block(self, room_id, nickname, blocked_by='방장'):
+        # 리스너 이벤트를 기다리지 않고 이 프로세스에는 바로 반영
+        with self._lock:
+            self._rooms.setdefault(room_id, set()).add(nickname)
+        db.reference(f'rooms/{room_id}/blocked_users').child(nickname).set({
+            'blocked_at': time.time(),
+            'blocked_by': blocked_by
+        })
+
+    def unblock(self, room_id, nickname):
+        with self._lock:
+            self._rooms.setdefault(room_id, set()).discard(nickname)
+        db.reference(f'rooms/{room_id}/blocked_users').child(nickname).delete()
+
+    def release(self, room_id):
+        """세션 하나가 방을 떠났음을 알립니다. 마지막 세션이면 구독을 해제합니다."""
+        with self._lock:
+            refs = self._refs.get(room_id, 0) - 1
+            if refs > 0:
+                self._refs[room_id] = refs
+                return
+            # 세션 수 확인과 상태 제거를 한 번의 잠금 안에서 처리 (그사이 watch()가 끼어들지 못함)
+            listener, loaded = self._drop_locked(room_id)
+        self._close(listener, loaded)
+
+    def unwatch(self, room_id):
+        """방의 차단 목록 구독을 세션 수와 관계없이 해제합니다."""
+        with self._lock:
+            listener, loaded = self._drop_locked(room_id)
+        self._close(listener, loaded)
+
+    def _drop_locked(self, room_id):
+        """방의 구독 상태를 모두 지웁니다. self._lock을 잡은 상태에서 호출합니다.
+        이후의 watch()는 새 리스너로 처음부터 구독하므로, 돌려받은 리스너는 잠금 밖에서 닫아도 됩니다."""
+        self._refs.pop(room_id, None)
+        self._rooms.pop(room_id, None)
+        return self._listeners.pop(room_id, None), self._loaded.pop(room_id, None)
+
+    @staticmethod
+    def _close(listener, loaded):
+        if loaded:
+            loaded.set()
+        if listener:
+            try:
+                listener.close()
+            except Exception as e:
+                print(f"차단 목록 리스너 해제 오류: {e}")
+
+
+# 프로세스 전체에서 공유하는 차단 사용자 캐시
+_blocked_user_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_blocked_user_cache():
+    global _blocked_user_cache
+    if _blocked_user_cache is None:
+        with _cache_lock:
+            if _blocked_user_cache is None:
+                _blocked_user_cache = BlockedUserCache()
+    return _blocked_user_cache
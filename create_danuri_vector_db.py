@@ -39,10 +39,11 @@ def create_danuri_vector_db():
             chunks = chunk_pdf_to_text_chunks(pdf_path, chunk_size=1000, chunk_overlap=100)
             print(f"  - 생성된 청크 수: {len(chunks)}")
             
-            # 각 청크에 대해 임베딩 생성
-            for j, chunk in enumerate(chunks):
-                print(f"    청크 {j+1}/{len(chunks)} 처리 중...")
-                
+            # 청크 임베딩을 배치로 한 번에 생성
+            print(f"    {len(chunks)}개 청크 임베딩 생성 중...")
+            chunk_embeddings = embeddings_model.embed_documents([chunk['page_content'] for chunk in chunks])
+            
+            for j, (chunk, embedding) in enumerate(zip(chunks, chunk_embeddings)):
                 # 문서 객체 생성 (chunk는 이미 page_content와 metadata를 포함)
                 document_obj = {
                     'page_content': chunk['page_content'],
@@ -57,17 +58,10 @@ def create_danuri_vector_db():
                     }
                 }
                 
-                # 임베딩 생성
-                embedding = embeddings_model.embed_query(chunk['page_content'])
-                
                 # 리스트에 추가
                 all_documents.append(document_obj)
                 all_embeddings.append(embedding)
                 total_chunks += 1
-                
-                # 진행상황 표시 (10개마다)
-                if (j + 1) % 10 == 0:
-                    print(f"      {j+1}/{len(chunks)} 완료")
             
             print(f"  ✅ {os.path.basename(pdf_path)} 처리 완료")
             
@@ -0,0 +1,165 @@
+"""
+질의 임베딩 캐시
+같은 질문(정규화된 텍스트, 모델, task_type)에 대한 임베딩을 메모리 LRU와
+선택적 SQLite 저장소에 보관하여 Gemini 임베딩 API 호출을 줄입니다.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+# 빈 문자열로 설정하면 디스크 저장소를 사용하지 않습니다
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "storage/embedding_cache.db")
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "2048"))
+
+
+def normalize_query(text):
+    """캐시 키로 쓸 수 있도록 질의 텍스트를 정규화합니다."""
+    text = unicodedata.normalize("NFC", str(text))
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+class EmbeddingCache:
+    def __init__(self, max_size=EMBEDDING_CACHE_SIZE, db_path=EMBEDDING_CACHE_PATH):
+        self.max_size = max_size
+        self.db_path = db_path or None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if self.db_path:
+            self._init_database()
+
+    def _init_database(self):
+        """디스크 캐시용 SQLite 테이블을 생성합니다."""
+        try:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path)
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS query_embeddings (
+                    text TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    task_type TEXT NOT NULL,
+                    embedding BLOB NOT NULL,
+                    PRIMARY KEY (text, model, task_type)
+                )
+            ''')
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"❌ 임베딩 디스크 캐시 초기화 실패, 메모리 캐시만 사용합니다: {e}")
+            self.db_path = None
+
+    def get(self, text, model, task_type):
+        key = (normalize_query(text), model, task_type)
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return list(embedding)
+        embedding = self._load_from_disk(key)
+        with self._lock:
+            if embedding is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._put_memory(key, embedding)
+        return list(embedding)
+
+    def put(self, text, model, task_type, embedding):
+        key = (normalize_query(text), model, task_type)
+        embedding = tuple(float(v) for v in embedding)
+        with self._lock:
+            self._put_memory(key, embedding)
+        self._save_to_disk(key, embedding)
+
+    def get_or_compute(self, text, model, task_type, compute):
+        """캐시에 없으면 compute()로 임베딩을 구해 저장한 뒤 반환합니다."""
+        embedding = self.get(text, model, task_type)
+        if embedding is None:
+            embedding = compute()
+            self.put(text, model, task_type, embedding)
+        return embedding
+
+    def _put_memory(self, key, embedding):
+        self._entries[key] = embedding
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _load_from_disk(self, key):
+        if not self.db_path:
+            return None
+        try:
+            conn = sqlite3.connect(self.db_path)
+            row = conn.execute(
+                'SELECT embedding FROM query_embeddings WHERE text = ? AND model = ? AND task_type = ?',
+                key
+            ).fetchone()
+            conn.close()
+        except Exception as e:
+            print(f"❌ 임베딩 디스크 캐시 조회 실패: {e}")
+            return None
+        if row is None:
+            return None
+        return tuple(np.frombuffer(row[0], dtype=np.float32).tolist())
+
+    def _save_to_disk(self, key, embedding):
+        if not self.db_path:
+            return
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute(
+                'INSERT OR REPLACE INTO query_embeddings (text, model, task_type, embedding) VALUES (?, ?, ?, ?)',
+                key + (np.asarray(embedding, dtype=np.float32).tobytes(),)
+            )
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"❌ 임베딩 디스크 캐시 저장 실패: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.disk_hits = self.misses = 0
+
+    def get_stats(self):
+        """캐시 적중/미적중 통계를 반환합니다."""
+        with self._lock:
+            total = self.hits + self.disk_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / total if total else 0.0,
+                "disk_enabled": bool(self.db_path),
+            }
+
+
+# 프로세스 전체에서 공유하는 질의 임베딩 캐시
+_query_embedding_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_query_embedding_cache():
+    global _query_embedding_cache
+    if _query_embedding_cache is None:
+        with _cache_lock:
+            if _query_embedding_cache is None:
+                _query_embedding_cache = EmbeddingCache()
+    return _query_embedding_cache
+
+
+def get_embedding_cache_stats():
+    return get_query_embedding_cache().get_stats()
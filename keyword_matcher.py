@@ -0,0 +1,112 @@
+"""
+다중 키워드 매칭 (Aho-Corasick)
+키워드 목록으로 오토마톤을 한 번 만들어 두고, 텍스트를 한 번만 훑어서
+모든 매칭 결과(위치, 키워드, 값, 우선순위)를 찾습니다.
+쓰레기 질문 감지, 구군명 추출, 부적절한 단어 검사에서 함께 사용합니다.
+"""
+
+from collections import deque, namedtuple
+
+# start/end는 원문 기준 위치 (end는 포함하지 않음), priority는 작을수록 우선
+KeywordMatch = namedtuple("KeywordMatch", ["start", "end", "keyword", "value", "priority"])
+
+
+def _lower_same_length(text):
+    """위치가 어긋나지 않도록 글자 수를 유지하면서 소문자로 바꿉니다."""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return "".join(ch if len(ch.lower()) != 1 else ch.lower() for ch in text)
+
+
+class KeywordMatcher:
+    def __init__(self, keywords, case_insensitive=True):
+        """keywords: 문자열 또는 (키워드, 값) 튜플 목록. 목록 순서가 우선순위가 됩니다."""
+        self.case_insensitive = case_insensitive
+        self._patterns = []
+        # 노드별 전이(dict), 실패 링크, 출력(패턴 id 목록)
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for priority, item in enumerate(keywords):
+            keyword, value = item if isinstance(item, tuple) else (item, item)
+            if not keyword:
+                continue
+            self._add(keyword.lower() if case_insensitive else keyword, keyword, value, priority)
+        self._build_fail_links()
+
+    def _add(self, pattern, keyword, value, priority):
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append(len(self._patterns))
+        self._patterns.append((len(pattern), keyword, value, priority))
+
+    def _build_fail_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def _scan(self, text):
+        """(끝 위치, 패턴 id)를 텍스트 순서대로 생성합니다."""
+        if self.case_insensitive:
+            text = _lower_same_length(text)
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for pattern_id in out[node]:
+                yield i + 1, pattern_id
+
+    def find_all(self, text):
+        """텍스트에 있는 모든 키워드 매칭을 시작 위치 순으로 반환합니다."""
+        matches = []
+        for end, pattern_id in self._scan(text):
+            length, keyword, value, priority = self._patterns[pattern_id]
+            matches.append(KeywordMatch(end - length, end, keyword, value, priority))
+        matches.sort(key=lambda m: (m.start, -(m.end - m.start)))
+        return matches
+
+    def contains_any(self, text):
+        """키워드가 하나라도 있으면 첫 매칭에서 바로 True를 반환합니다."""
+        for _ in self._scan(text):
+            return True
+        return False
+
+    def first_by_priority(self, text):
+        """우선순위(키워드 목록 순서)가 가장 높은 매칭을 반환합니다."""
+        matches = self.find_all(text)
+        return min(matches, key=lambda m: m.priority) if matches else None
+
+    def longest_match(self, text):
+        """가장 긴 매칭을 반환합니다. 길이가 같으면 우선순위, 그다음 앞쪽 위치가 이깁니다."""
+        matches = self.find_all(text)
+        if not matches:
+            return None
+        return min(matches, key=lambda m: (-(m.end - m.start), m.priority, m.start))
+
+    def mask(self, text, mask_char="*"):
+        """매칭된 모든 구간을 mask_char로 가립니다."""
+        chars = None
+        for end, pattern_id in self._scan(text):
+            length = self._patterns[pattern_id][0]
+            if chars is None:
+                chars = list(text)
+            chars[end - length:end] = mask_char * length
+        return text if chars is None else "".join(chars)
@@ -0,0 +1,136 @@
+"""
+문자 체계 기반 언어 감지
+코드포인트 → 언어 버킷 표를 모듈 로드 시 한 번만 만들고,
+텍스트를 한 번만 훑으면서 문자마다 버킷 점수를 올립니다.
+키릴 문자는 언어별 고유 문자로 우즈벡어/몽골어/키르기스어를 구분합니다.
+"""
+
+# 점수가 같을 때는 이 순서의 앞쪽 언어가 선택됩니다 (기존 detect_language와 동일한 순서)
+LANGUAGES = ('ko', 'en', 'ja', 'zh', 'vi', 'fr', 'de', 'th', 'uz', 'ne',
+             'tet', 'lo', 'mn', 'my', 'bn', 'si', 'km', 'ky', 'ur')
+_LANG_INDEX = {lang: i for i, lang in enumerate(LANGUAGES)}
+
+# 언어별 문자 범위 (시작, 끝 포함)
+_SCRIPT_RANGES = {
+    'ko': [(0xAC00, 0xD7A3)],
+    'en': [(ord('a'), ord('z')), (ord('A'), ord('Z'))],
+    'ja': [(ord('あ'), ord('ん')), (ord('ア'), ord('ン'))],
+    'zh': [(0x4E00, 0x9FFF)],
+    'th': [(0x0E00, 0x0E7F)],
+    'ne': [(0x0900, 0x097F)],
+    'lo': [(0x0E80, 0x0EFF)],
+    'my': [(0x1000, 0x109F)],
+    'bn': [(0x0980, 0x09FF)],
+    'si': [(0x0D80, 0x0DFF)],
+    'km': [(0x1780, 0x17FF)],
+    'ur': [(0x0600, 0x06FF)],
+}
+
+# 라틴 확장 문자 (여러 언어에 동시에 점수가 올라갈 수 있음)
+_LATIN_LETTERS = {
+    'vi': 'àáạảãâầấậẩẫăằắặẳẵèéẹẻẽêềếệểễìíịỉĩòóọỏõôồốộổỗơờớợởỡùúụủũưừứựửữỳýỵỷỹđ',
+    'fr': 'àâäéèêëïîôöùûüÿç',
+    'de': 'äöüß',
+    'tet': 'àáâãäåæçèéêëìíîïñòóôõöùúûüýÿ',
+}
+
+# 키릴 문자와 언어별 고유 문자
+_CYRILLIC_LETTERS = 'абвгдеёжзийклмнопрстуфхцчшщъыьэюяАБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ'
+_UZBEK_LETTERS = 'ўқғҳЎҚҒҲ'
+_KYRGYZ_LETTERS = 'ңҢ'
+_MONGOLIAN_KYRGYZ_LETTERS = 'өүӨҮ'
+
+# 다른 언어와 문자를 공유하지 않는 버킷 (과반이 되면 결과가 확정됨)
+_EXCLUSIVE = frozenset(_LANG_INDEX[lang] for lang in _SCRIPT_RANGES)
+
+_CYRILLIC = -1
+_UZ_MARK = -2
+_KY_MARK = -3
+_MN_KY_MARK = -4
+
+
+def _build_char_table():
+    table = {}
+
+    def add(ch, bucket):
+        table[ch] = table.get(ch, ()) + (bucket,)
+
+    for lang, ranges in _SCRIPT_RANGES.items():
+        for start, end in ranges:
+            for code in range(start, end + 1):
+                add(chr(code), _LANG_INDEX[lang])
+    for lang, letters in _LATIN_LETTERS.items():
+        for ch in letters:
+            add(ch, _LANG_INDEX[lang])
+    for ch in _CYRILLIC_LETTERS:
+        add(ch, _CYRILLIC)
+    for letters, mark in ((_UZBEK_LETTERS, _UZ_MARK), (_KYRGYZ_LETTERS, _KY_MARK), (_MONGOLIAN_KYRGYZ_LETTERS, _MN_KY_MARK)):
+        for ch in letters:
+            add(ch, _CYRILLIC)
+            add(ch, mark)
+    return table
+
+
+_CHAR_TABLE = _build_char_table()
+
+
+def _resolve_cyrillic(uz_marks, ky_marks, mn_ky_marks):
+    """키릴 문자 텍스트가 우즈벡어/몽골어/키르기스어 중 무엇인지 고유 문자로 판단합니다."""
+    # ң는 키르기스어에만 있고, ө/ү는 몽골어와 키르기스어에 모두 있습니다
+    scores = {
+        'uz': uz_marks,
+        'mn': 0 if ky_marks else mn_ky_marks,
+        'ky': ky_marks + mn_ky_marks if ky_marks else 0,
+    }
+    return max(scores, key=scores.get)
+
+
+def detect_language(text):
+    """텍스트의 언어를 감지합니다."""
+    # ASCII만 있으면 영어 외의 버킷은 점수가 날 수 없습니다
+    if not text or text.isascii():
+        return 'en'
+
+    counts = [0] * len(LANGUAGES)
+    cyrillic = uz_marks = ky_marks = mn_ky_marks = 0
+    table = _CHAR_TABLE
+    half = len(text) // 2
+
+    for ch in text:
+        buckets = table.get(ch)
+        if buckets is None:
+            continue
+        for bucket in buckets:
+            if bucket >= 0:
+                counts[bucket] += 1
+                # 고유 문자 체계가 과반이면 다른 언어가 따라잡을 수 없으므로 바로 반환
+                if counts[bucket] > half and bucket in _EXCLUSIVE:
+                    return LANGUAGES[bucket]
+            elif bucket == _CYRILLIC:
+                cyrillic += 1
+            elif bucket == _UZ_MARK:
+                uz_marks += 1
+            elif bucket == _KY_MARK:
+                ky_marks += 1
+            else:
+                mn_ky_marks += 1
+
+    if cyrillic:
+        counts[_LANG_INDEX[_resolve_cyrillic(uz_marks, ky_marks, mn_ky_marks)]] = cyrillic
+
+    best = max(range(len(LANGUAGES)), key=counts.__getitem__)
+    # 점수가 0이면 기본값으로 영어 반환
+    if counts[best] == 0:
+        return 'en'
+    return LANGUAGES[best]
+
+
+# 다른 언어와 문자를 공유하지 않아 감지 결과를 믿을 수 있는 언어
+UNAMBIGUOUS_LANGUAGES = frozenset(('ko', 'ja', 'th', 'ne', 'lo', 'my', 'bn', 'si', 'km', 'ur'))
+
+
+def is_already_in_language(text, target_lang):
+    """텍스트가 이미 target_lang으로 쓰였다고 확실히 말할 수 있으면 True를 반환합니다."""
+    if target_lang not in UNAMBIGUOUS_LANGUAGES:
+        return False
+    return detect_language(text) == target_lang
@@ -0,0 +1,114 @@
+"""
+프로세스 공용 Gemini 클라이언트
+- genai.configure는 API 키가 바뀔 때만 호출합니다 (내부 gRPC 클라이언트와 연결을 재사용).
+- GenerativeModel 객체를 (모델명, 생성 설정)별로 한 번만 만들어 재사용합니다.
+- 동시에 진행되는 생성 요청 수를 세마포어로 제한하고, 호출 수/지연 시간/대기 시간을 기록합니다.
+"""
+
+import os
+import threading
+import time
+
+import google.generativeai as genai
+
+DEFAULT_MODEL = "gemini-2.0-flash-lite"
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+
+_configure_lock = threading.Lock()
+_configured_api_key = None
+
+_models = {}
+_models_lock = threading.Lock()
+
+_semaphore = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+_metrics_lock = threading.Lock()
+_metrics = {
+    "calls": 0,
+    "errors": 0,
+    "streamed_calls": 0,
+    "in_flight": 0,
+    "max_in_flight": 0,
+    "total_latency": 0.0,
+    "total_wait": 0.0,
+    "model_handles_created": 0,
+    "configure_calls": 0,
+}
+
+
+def configure(api_key):
+    """API 키가 바뀐 경우에만 genai.configure를 호출합니다."""
+    global _configured_api_key
+    if api_key == _configured_api_key:
+        return
+    with _configure_lock:
+        if api_key != _configured_api_key:
+            genai.configure(api_key=api_key)
+            _configured_api_key = api_key
+            with _metrics_lock:
+                _metrics["configure_calls"] += 1
+
+
+def get_model(api_key, model_name=DEFAULT_MODEL, generation_config=None):
+    """(모델명, 생성 설정)별로 캐시된 GenerativeModel을 반환합니다."""
+    configure(api_key)
+    key = (model_name, tuple(sorted((generation_config or {}).items())))
+    model = _models.get(key)
+    if model is None:
+        with _models_lock:
+            model = _models.get(key)
+            if model is None:
+                model = genai.GenerativeModel(model_name, generation_config=generation_config)
+                _models[key] = model
+                with _metrics_lock:
+                    _metrics["model_handles_created"] += 1
+    return model
+
+
+def generate_text(api_key, prompt, generation_config=None, model_name=DEFAULT_MODEL, on_chunk=None):
+    """프롬프트로 텍스트를 생성합니다. on_chunk가 있으면 스트리밍하면서 조각마다 호출합니다."""
+    model = get_model(api_key, model_name, generation_config)
+    wait_start = time.time()
+    with _semaphore:
+        start = time.time()
+        with _metrics_lock:
+            _metrics["total_wait"] += start - wait_start
+            _metrics["in_flight"] += 1
+            _metrics["max_in_flight"] = max(_metrics["max_in_flight"], _metrics["in_flight"])
+        try:
+            if on_chunk:
+                parts = []
+                for chunk in model.generate_content(prompt, stream=True):
+                    try:
+                        text = chunk.text
+                    except Exception:
+                        # 안전 필터 등으로 텍스트가 없는 조각은 건너뜀
+                        continue
+                    if text:
+                        parts.append(text)
+                        on_chunk(text)
+                answer = "".join(parts).strip()
+            else:
+                answer = model.generate_content(prompt).text.strip()
+        except Exception:
+            with _metrics_lock:
+                _metrics["errors"] += 1
+            raise
+        finally:
+            with _metrics_lock:
+                _metrics["in_flight"] -= 1
+                _metrics["calls"] += 1
+                _metrics["streamed_calls"] += 1 if on_chunk else 0
+                _metrics["total_latency"] += time.time() - start
+    return answer
+
+
+def get_llm_metrics():
+    """호출 수, 평균 지연/대기 시간, 동시 실행 수 등 LLM 호출 지표를 반환합니다."""
+    with _metrics_lock:
+        metrics = dict(_metrics)
+    calls = metrics["calls"]
+    metrics["avg_latency"] = round(metrics["total_latency"] / calls, 3) if calls else 0.0
+    metrics["avg_wait"] = round(metrics["total_wait"] / calls, 3) if calls else 0.0
+    metrics["max_concurrency"] = LLM_MAX_CONCURRENCY
+    metrics["cached_models"] = len(_models)
+    return metrics
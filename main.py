@@ -39,8 +39,20 @@ import time
 import firebase_admin
 from firebase_admin import credentials, db
 from rag_utils import get_or_create_vector_db, answer_with_rag, answer_with_rag_foreign_worker
-from rag_utils import SimpleVectorDB, GeminiEmbeddings
-from restaurant_search_system import search_restaurants
+from rag_utils import SimpleVectorDB, GeminiEmbeddings, load_vector_db, vector_db_exists
+from vector_store import get_store_prefix, vector_store_exists
+from vector_db_registry import VectorDBRegistry
+from restaurant_search_system import search_restaurants, get_restaurant_search
+from room_meta_cache import get_room_meta_cache, get_room_meta
+from timer_scheduler import get_scheduler, get_scheduler_stats
+from runtime_stats import register_stats, start_stats_logging
+from session_lifecycle import get_session_stats
+from embedding_cache import get_embedding_cache_stats
+from llm_client import get_llm_metrics
+from translation_cache import get_translation_cache_stats
+from translation_batcher import get_translation_batcher_stats
+from answer_cache import get_answer_cache_stats
+from sqlite_pool import get_write_queue
 
 
 IS_SERVER = os.environ.get("CLOUDTYPE") == "1"  # Cloudtype 환경변수 등으로 구분
@@ -97,68 +109,54 @@ except Exception as e:
 # OpenAI 관련 client = openai.OpenAI(api_key=OPENAI_API_KEY) 제거
 
 # RAG용 벡터DB 준비 (무조건 병합본만 사용)
-print("RAG 벡터DB 준비 중...")
+# 벡터DB는 백그라운드에서 로드하고, RAG 채팅방의 첫 질문은 필요한 DB만 기다립니다.
 VECTOR_DB_MERGED_PATH = "다문화.pkl"
 VECTOR_DB_FOREIGN_WORKER_PATH = "외국인근로자.pkl"
 VECTOR_DB_RESTAURANT_PATH = "부산의맛.pkl"
-vector_db_multicultural = None
-vector_db_foreign_worker = None
 
-# 다문화가족 한국생활안내 벡터DB 로드
-try:
-    if os.path.exists(VECTOR_DB_MERGED_PATH):
-        print("다문화가족 벡터DB 파일을 로드합니다...")
-        print(f"벡터DB 파일 크기: {os.path.getsize(VECTOR_DB_MERGED_PATH)} bytes")
-        with open(VECTOR_DB_MERGED_PATH, "rb") as f:
-            vector_db_multicultural = pickle.load(f)
-        print(f"벡터DB 로드 완료. 문서 수: {len(vector_db_multicultural.documents) if hasattr(vector_db_multicultural, 'documents') else '알 수 없음'}")
-        vector_db_multicultural.embeddings = GeminiEmbeddings(
-            gemini_api_key=GEMINI_API_KEY
-        )
-        print("다문화가족 벡터DB 로드 완료!")
-    else:
+def load_multicultural_db():
+    """다문화가족 한국생활안내 벡터DB 로드"""
+    if not vector_db_exists(VECTOR_DB_MERGED_PATH):
         print("다문화가족 벡터DB 파일이 없습니다.")
-except Exception as e:
-    print(f"다문화가족 벡터DB 로드 중 오류 발생: {e}")
-    vector_db_multicultural = None
+        return None
+    vector_db = load_vector_db(VECTOR_DB_MERGED_PATH, GEMINI_API_KEY)
+    print(f"다문화가족 벡터DB 로드 완료! 문서 수: {len(vector_db.documents)}")
+    return vector_db
 
-# 외국인 권리구제 벡터DB 로드
-try:
-    if os.path.exists(VECTOR_DB_FOREIGN_WORKER_PATH):
-        print("외국인 권리구제 벡터DB 파일을 로드합니다...")
-        print(f"벡터DB 파일 크기: {os.path.getsize(VECTOR_DB_FOREIGN_WORKER_PATH)} bytes")
-        with open(VECTOR_DB_FOREIGN_WORKER_PATH, "rb") as f:
-            vector_db_foreign_worker = pickle.load(f)
-        print(f"벡터DB 로드 완료. 문서 수: {len(vector_db_foreign_worker.documents) if hasattr(vector_db_foreign_worker, 'documents') else '알 수 없음'}")
-        vector_db_foreign_worker.embeddings = GeminiEmbeddings(
-            gemini_api_key=GEMINI_API_KEY
-        )
-        print("외국인 권리구제 벡터DB 로드 완료!")
-    else:
+def load_foreign_worker_db():
+    """외국인 권리구제 벡터DB 로드"""
+    if not vector_db_exists(VECTOR_DB_FOREIGN_WORKER_PATH):
         print("외국인 권리구제 벡터DB 파일이 없습니다.")
-except Exception as e:
-    print(f"외국인 권리구제 벡터DB 로드 중 오류 발생: {e}")
-    vector_db_foreign_worker = None
+        return None
+    vector_db = load_vector_db(VECTOR_DB_FOREIGN_WORKER_PATH, GEMINI_API_KEY)
+    print(f"외국인 권리구제 벡터DB 로드 완료! 문서 수: {len(vector_db.documents)}")
+    return vector_db
 
-# 부산맛집 벡터DB 로드
-try:
-    if os.path.exists(VECTOR_DB_RESTAURANT_PATH):
-        print("부산맛집 벡터DB 파일을 로드합니다...")
-        print(f"벡터DB 파일 크기: {os.path.getsize(VECTOR_DB_RESTAURANT_PATH)} bytes")
-        with open(VECTOR_DB_RESTAURANT_PATH, "rb") as f:
-            restaurant_vector_db = pickle.load(f)
-        print(f"부산맛집 벡터DB 로드 완료. 문서 수: {len(restaurant_vector_db['chunks']) if isinstance(restaurant_vector_db, dict) and 'chunks' in restaurant_vector_db else '알 수 없음'}")
-        print("부산맛집 벡터DB 로드 완료!")
-    else:
-        print("부산맛집 벡터DB 파일이 없습니다.")
-except Exception as e:
-    print(f"부산맛집 벡터DB 로드 중 오류 발생: {e}")
-    restaurant_vector_db = None
+def load_restaurant_search():
+    """부산맛집 검색 시스템(JSON + 부산의맛 벡터DB) 로드"""
+    if not os.path.exists(VECTOR_DB_RESTAURANT_PATH) and not vector_store_exists(get_store_prefix(VECTOR_DB_RESTAURANT_PATH)):
+        print("부산맛집 벡터DB 파일이 없습니다. JSON 검색만 사용합니다.")
+    return get_restaurant_search(GEMINI_API_KEY)
 
-# RAG 기능 사용 가능 여부 설정 (vector_db 정의 후)
-RAG_AVAILABLE = vector_db_multicultural is not None and vector_db_foreign_worker is not None
+VECTOR_DBS = VectorDBRegistry()
+VECTOR_DBS.register("multicultural", load_multicultural_db, "다문화가족 벡터DB")
+VECTOR_DBS.register("foreign_worker", load_foreign_worker_db, "외국인 권리구제 벡터DB")
+VECTOR_DBS.register("restaurant", load_restaurant_search, "부산맛집 검색 시스템")
+VECTOR_DBS.start_background_loading()
+print("RAG 벡터DB 백그라운드 로딩 시작")
 
-print("RAG 벡터DB 준비 완료!")
+# 런타임 지표는 STATS_LOG_INTERVAL초마다 모듈별로 한 줄씩 로그에 출력
+register_stats("sessions", get_session_stats)
+register_stats("query_embedding_cache", get_embedding_cache_stats)
+register_stats("answer_cache", get_answer_cache_stats)
+register_stats("vector_dbs", VECTOR_DBS.get_stats)
+register_stats("llm", get_llm_metrics)
+register_stats("translation_cache", get_translation_cache_stats)
+register_stats("translation_batcher", get_translation_batcher_stats)
+register_stats("room_meta_cache", lambda: get_room_meta_cache().get_stats())
+register_stats("timer_scheduler", get_scheduler_stats)
+register_stats("sqlite_writer", lambda: get_write_queue().get_stats())
+start_stats_logging()
 
 FIND_ROOM_TEXTS = {
     "ko": {
@@ -543,8 +541,8 @@ def main(page: ft.Page):
         # 고정 채팅방인지 확인
         is_persistent = False
         try:
-            room_ref = db.reference(f'/rooms/{room_id}')
-            room_data = room_ref.get()
+            # messages까지 내려받지 않도록 메타데이터 캐시에서 조회
+            room_data = get_room_meta(room_id)
             if room_data and room_data.get('is_persistent'):
                 is_persistent = True
         except:
@@ -660,6 +658,7 @@ def main(page: ft.Page):
                 'creator_id': page.session.get('user_id') or str(uuid.uuid4())  # 생성자 고유 ID 추가
             }
             rooms_ref.child(new_room_id).set(room_data)
+            get_room_meta_cache().put(new_room_id, room_data)
             print(f"✅ Firebase에 방 '{room_title}' 정보 저장 성공 (고정: {is_persistent}, 생성자: {room_data['created_by']})")
         except Exception as e:
             print(f"❌ Firebase 방 정보 저장 실패: {e}")
@@ -1069,13 +1068,10 @@ def main(page: ft.Page):
             page.snack_bar.open = True
             page.update()
             
-            # 시뮬레이션을 위한 스레드 시작
-            import threading
-            import time
+            # 시뮬레이션 (3초 후 공용 스케줄러에서 실행)
             import random
             
             def simulate_qr_scan():
-                time.sleep(3)
                 # 실제 Firebase에 존재하는 일반 사용자 채팅방 ID들만 사용 (RAG 방 제외)
                 room_id = random.choice([
                     "03558704",  # 실제 존재하는 방
@@ -1090,9 +1086,7 @@ def main(page: ft.Page):
                 callback(test_data)
             
             # 백그라운드에서 시뮬레이션 실행
-            thread = threading.Thread(target=simulate_qr_scan)
-            thread.daemon = True
-            thread.start()
+            get_scheduler().call_later(3, simulate_qr_scan)
             
         except Exception as e:
             print(f"QR코드 스캔 시작 중 오류 발생: {e}")
@@ -1213,9 +1207,8 @@ def main(page: ft.Page):
         
         try:
             print(f"Firebase에서 방 정보 조회 시작")
-            room_ref = db.reference(f'/rooms/{room_id}')
-            print(f"Firebase 참조 생성: {room_ref}")
-            room_data = room_ref.get()
+            # 방 메타데이터만 조회 (messages 하위 트리는 내려받지 않음)
+            room_data = get_room_meta(room_id)
             print(f"Firebase에서 가져온 room_data: {room_data}")
             
             if room_data:
@@ -1265,14 +1258,16 @@ def main(page: ft.Page):
             
             # 맛집검색 RAG 채팅방인지 확인
             if is_restaurant_search_rag:
-                def restaurant_search_answer(query, target_lang):
+                def restaurant_search_answer(query, target_lang, on_chunk=None):
                     try:
                         print(f"맛집검색 질문: {query}")
                         print(f"타겟 언어: {target_lang}")
                         print(f"전달할 target_lang: {target_lang}")
                         
-                        # 맛집검색 시스템 사용
-                        result = search_restaurants(query, GEMINI_API_KEY)
+                        # 맛집검색 시스템 사용 (백그라운드 로딩 중이면 완료될 때까지 대기)
+                        VECTOR_DBS.get("restaurant")
+                        # 한국어 답변만 스트리밍 (다른 언어는 번역된 최종 답변으로 표시)
+                        result = search_restaurants(query, GEMINI_API_KEY, on_chunk=on_chunk if target_lang == "ko" else None)
                         print(f"맛집검색 답변 생성 완료: {len(result)} 문자")
                         # 한국어가 아니면 번역 적용
                         if target_lang != "ko":
@@ -1302,7 +1297,7 @@ def main(page: ft.Page):
                 # 대화 컨텍스트를 저장할 변수
                 conversation_context = {}
                 
-                def foreign_worker_rag_answer(query, target_lang):
+                def foreign_worker_rag_answer(query, target_lang, on_chunk=None):
                     try:
                         print(f"외국인 권리구제 RAG 질문: {query}")
                         print(f"타겟 언어: {target_lang}")
@@ -1312,18 +1307,20 @@ def main(page: ft.Page):
                         from rag_utils import is_waste_related_query
                         if is_waste_related_query(query):
                             # 쓰레기 처리 관련 질문이면 다문화가족 벡터DB 사용
+                            vector_db_multicultural = VECTOR_DBS.get("multicultural")
                             if vector_db_multicultural is None:
                                 print("다문화가족 벡터DB가 None입니다.")
                                 return "죄송합니다. RAG 기능이 현재 사용할 수 없습니다. (다문화가족 벡터DB가 로드되지 않았습니다.)"
                             print(f"쓰레기 처리 질문 - 다문화가족 벡터DB 사용")
-                            result = answer_with_rag_foreign_worker(query, vector_db_multicultural, GEMINI_API_KEY, target_lang=target_lang, conversation_context=conversation_context)
+                            result = answer_with_rag_foreign_worker(query, vector_db_multicultural, GEMINI_API_KEY, target_lang=target_lang, conversation_context=conversation_context, on_chunk=on_chunk)
                         else:
                             # 일반 외국인 근로자 관련 질문이면 외국인 근로자 벡터DB 사용
+                            vector_db_foreign_worker = VECTOR_DBS.get("foreign_worker")
                             if vector_db_foreign_worker is None:
                                 print("외국인 권리구제 벡터DB가 None입니다.")
                                 return "죄송합니다. RAG 기능이 현재 사용할 수 없습니다. (외국인 권리구제 벡터DB가 로드되지 않았습니다.)"
                             print(f"외국인 근로자 질문 - 외국인 근로자 벡터DB 사용")
-                            result = answer_with_rag_foreign_worker(query, vector_db_foreign_worker, GEMINI_API_KEY, target_lang=target_lang, conversation_context=conversation_context)
+                            result = answer_with_rag_foreign_worker(query, vector_db_foreign_worker, GEMINI_API_KEY, target_lang=target_lang, conversation_context=conversation_context, on_chunk=on_chunk)
                         
                         print(f"RAG 답변 생성 완료: {len(result)} 문자")
                         return result
@@ -1350,16 +1347,17 @@ def main(page: ft.Page):
                 # 대화 컨텍스트를 저장할 변수
                 conversation_context = {}
                 
-                def multicultural_rag_answer(query, target_lang):
+                def multicultural_rag_answer(query, target_lang, on_chunk=None):
                     try:
                         print(f"다문화 가족 RAG 질문: {query}")
                         print(f"타겟 언어: {target_lang}")
                         print(f"전달할 target_lang: {target_lang}")
+                        vector_db_multicultural = VECTOR_DBS.get("multicultural")
                         if vector_db_multicultural is None:
                             print("다문화가족 벡터DB가 None입니다.")
                             return "죄송합니다. RAG 기능이 현재 사용할 수 없습니다. (다문화가족 벡터DB가 로드되지 않았습니다.)"
                         print(f"다문화가족 벡터DB 문서 수: {len(vector_db_multicultural.documents) if hasattr(vector_db_multicultural, 'documents') else '알 수 없음'}")
-                        result = answer_with_rag(query, vector_db_multicultural, GEMINI_API_KEY, target_lang=target_lang, conversation_context=conversation_context)
+                        result = answer_with_rag(query, vector_db_multicultural, GEMINI_API_KEY, target_lang=target_lang, conversation_context=conversation_context, on_chunk=on_chunk)
                         print(f"RAG 답변 생성 완료: {len(result)} 문자")
                         return result
                     except Exception as e:
@@ -6,10 +6,21 @@ import time
 from firebase_admin import db
 import uuid
 import threading
-import google.generativeai as genai
 import atexit
 import re
+from collections import deque
 from datetime import datetime
+from language_detector import is_already_in_language
+from keyword_matcher import KeywordMatcher
+from translation_batcher import get_translation_batcher
+from translation_pipeline import TranslationPipeline
+from translation_cache import get_translation_cache
+from blocked_user_cache import get_blocked_user_cache
+from room_meta_cache import get_room_meta
+from room_subscription_hub import get_room_hub
+from session_lifecycle import get_session_manager
+from timer_scheduler import get_scheduler
+from runtime_stats import register_stats
 
 IS_SERVER = os.environ.get("CLOUDTYPE") == "1"
 
@@ -25,18 +36,19 @@ INAPPROPRIATE_WORDS = [
     "ㅋㅋㅋㅋㅋㅋㅋㅋㅋㅋ", "ㅎㅎㅎㅎㅎㅎㅎㅎㅎㅎ", "!!!!!", "?????", "ㅠㅠㅠㅠㅠㅠㅠㅠㅠㅠ"
 ]
 
+# 부적절한 단어 검사용 오토마톤 (메시지를 한 번만 훑어서 모든 단어를 찾음)
+INAPPROPRIATE_WORD_MATCHER = KeywordMatcher(INAPPROPRIATE_WORDS)
+REPEATED_CHAR_PATTERN = re.compile(r'(.)\1{4,}')
+
 def is_inappropriate_message(message):
     """부적절한 메시지인지 확인"""
-    message_lower = message.lower()
-    
     # 부적절한 단어 포함 여부 확인
-    for word in INAPPROPRIATE_WORDS:
-        if word in message_lower:
-            return True, f"부적절한 단어가 포함되어 있습니다: {word}"
+    match = INAPPROPRIATE_WORD_MATCHER.first_by_priority(message)
+    if match:
+        return True, f"부적절한 단어가 포함되어 있습니다: {match.keyword}"
     
     # 반복 문자 체크 (같은 문자 5번 이상 반복)
-    repeated_chars = re.findall(r'(.)\1{4,}', message)
-    if repeated_chars:
+    if REPEATED_CHAR_PATTERN.search(message):
         return True, "반복되는 문자가 너무 많습니다"
     
     # 메시지 길이 체크 (너무 긴 메시지)
@@ -52,31 +64,80 @@ def is_inappropriate_message(message):
 
 def filter_message(message):
     """메시지 필터링 (부적절한 단어 마스킹)"""
-    filtered_message = message
-    for word in INAPPROPRIATE_WORDS:
-        if word.lower() in filtered_message.lower():
-            # 부적절한 단어를 *로 마스킹
-            import re
-            pattern = re.compile(re.escape(word), re.IGNORECASE)
-            filtered_message = pattern.sub('*' * len(word), filtered_message)
-    
-    return filtered_message
+    # 부적절한 단어를 *로 마스킹
+    return INAPPROPRIATE_WORD_MATCHER.mask(message)
 
 # Gemini 기반 번역 함수 (예시: 실제 구현 필요)
 def translate_message(text, target_lang):
+    # 이미 대상 언어로 쓰인 메시지는 번역 요청 없이 그대로 반환
+    if is_already_in_language(text, target_lang):
+        return text
+    # 자주 반복되는 문장은 캐시된 번역문을 바로 반환
+    cache = get_translation_cache()
+    cached = cache.get(text, target_lang)
+    if cached is not None:
+        return cached
     try:
-        genai.configure(api_key=GEMINI_API_KEY)
-        model = genai.GenerativeModel("gemini-2.0-flash-lite")
-        # 언어 코드 → 영어 언어명 매핑
-        lang_map = {
-            "en": "English", "ko": "Korean", "ja": "Japanese", "zh": "Chinese", "zh-TW": "Traditional Chinese", "id": "Indonesian", "vi": "Vietnamese", "fr": "French", "de": "German", "th": "Thai", "uz": "Uzbek", "ne": "Nepali", "tet": "Tetum", "lo": "Lao", "mn": "Mongolian", "my": "Burmese", "bn": "Bengali", "si": "Sinhala", "km": "Khmer", "ky": "Kyrgyz", "ur": "Urdu"
-        }
-        target_lang_name = lang_map.get(target_lang, target_lang)
-        prompt = f"Translate the following text to {target_lang_name} and return only the translation.\n{text}"
-        response = model.generate_content(prompt, generation_config={"max_output_tokens": 512, "temperature": 0.2})
-        return response.text.strip()
+        # 짧은 시간 안에 들어온 번역 요청은 한 번의 호출로 묶어서 처리
+        translated = get_translation_batcher(GEMINI_API_KEY).translate(text, target_lang)
     except Exception as e:
         return f"[번역 오류] {e}"
+    cache.put(text, target_lang, translated)
+    return translated
+
+# 메시지는 먼저 보내고 번역은 공용 워커 풀에서 처리 (채팅방별 동시 번역 수 제한)
+translation_pipeline = TranslationPipeline(translate_message)
+register_stats("translation_pipeline", translation_pipeline.get_stats)
+
+# RAG 답변 스트리밍 시 말풍선 갱신 최소 간격 (초)
+STREAM_UPDATE_INTERVAL = 0.15
+
+# Firebase 리스너 이벤트를 모아서 화면에 반영하는 간격 (초)
+MESSAGE_FRAME_INTERVAL = 0.1
+
+# 화면에 유지하는 최근 메시지 수와 "이전 메시지 불러오기" 한 번에 가져오는 수
+HISTORY_WINDOW = int(os.getenv("CHAT_HISTORY_WINDOW", "200"))
+HISTORY_PAGE_SIZE = int(os.getenv("CHAT_HISTORY_PAGE_SIZE", "50"))
+# 이전 기록을 불러와 늘어난 창의 최대 크기 (이보다 오래된 기록은 더 불러오지 않음)
+HISTORY_MAX_WINDOW = int(os.getenv("CHAT_HISTORY_MAX_WINDOW", "1000"))
+# 같은 닉네임의 입장 안내를 다시 보내지 않는 시간 (초)
+JOIN_DEDUP_WINDOW = 120
+
+# Firebase 키에 쓸 수 없는 문자
+PRESENCE_KEY_PATTERN = re.compile(r'[.$#\[\]/]')
+
+
+def to_presence_key(nickname):
+    """닉네임을 Firebase presence 노드 키로 쓸 수 있게 바꿉니다."""
+    return PRESENCE_KEY_PATTERN.sub('_', nickname) or '_'
+
+# 중복 표시 방지를 위해 기억하는 최근 메시지 키 수 (화면 창보다 넉넉하게)
+SEEN_MESSAGE_KEYS = int(os.getenv("CHAT_SEEN_MESSAGE_KEYS", "2000"))
+
+
+class SeenKeys:
+    """최근 max_size개의 키만 기억하는 집합 (링 버퍼 + set, 조회/추가 O(1))"""
+
+    def __init__(self, max_size=SEEN_MESSAGE_KEYS):
+        self.max_size = max_size
+        self._keys = set()
+        self._order = deque()
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, key):
+        """새 키면 기억하고 True, 이미 본 키면 False를 반환합니다."""
+        if key in self._keys:
+            return False
+        self._keys.add(key)
+        self._order.append(key)
+        if len(self._order) > self.max_size:
+            self._keys.discard(self._order.popleft())
+        return True
 
 # 언어 코드에 따른 전체 언어 이름 매핑
 LANG_NAME_MAP = {
@@ -98,7 +159,8 @@ SYSTEM_MESSAGES = {
         "block_confirm": "사용자 차단",
         "block_content": "{nickname}님을 차단하시겠습니까?\n차단된 사용자의 메시지는 더 이상 표시되지 않습니다.",
         "cancel": "취소",
-        "block": "차단"
+        "block": "차단",
+        "load_older": "이전 메시지 불러오기"
     },
     "en": {
         "join": "{nickname} has joined the chat room.",
@@ -108,7 +170,8 @@ SYSTEM_MESSAGES = {
         "block_confirm": "Block User",
         "block_content": "Do you want to block {nickname}?\nBlocked users' messages will no longer be displayed.",
         "cancel": "Cancel",
-        "block": "Block"
+        "block": "Block",
+        "load_older": "Load older messages"
     },
     "ja": {
         "join": "{nickname}さんがチャットルームに参加しました。",
@@ -1719,6 +1782,9 @@ def ChatRoomPage(page, room_id, room_title, user_lang, target_lang, on_back=None
         focused_border_color=ft.Colors.BLUE_400,
     )
 
+    # 방장 여부는 화면을 열 때 한 번만 확인 (메시지 반영 중에는 방 정보를 조회하지 않음)
+    is_current_owner = is_room_owner(room_id, page.session.get('nickname') or '', page.session.get('user_id'))
+
     def create_message_bubble(msg_data, is_me):
         # 닉네임이 '익명'이고 본문/번역문이 모두 비어있으면 말풍선 생성하지 않음
         if msg_data.get('nickname', '') == '익명' and not msg_data.get('text', '').strip() and not msg_data.get('translated', '').strip():
@@ -1740,10 +1806,8 @@ def ChatRoomPage(page, room_id, room_title, user_lang, target_lang, on_back=None
         # 차단 버튼 (방장이고, 자신의 메시지가 아니고, 시스템/RAG 메시지가 아닐 때만 표시)
         block_button = None
         if not is_me and nickname not in ['시스템', 'RAG', '익명']:
-            # 방장 권한 확인
-            current_nickname = page.session.get('nickname') or ''
-            current_user_id = page.session.get('user_id')
-            if is_room_owner(room_id, current_nickname, current_user_id):
+            # 방장 권한 확인 (화면을 열 때 한 번 확인한 값)
+            if is_current_owner:
                 block_button = ft.IconButton(
                     icon=ft.Icons.BLOCK,
                     icon_color=ft.Colors.RED_400,
@@ -1825,104 +1889,258 @@ def ChatRoomPage(page, room_id, room_title, user_lang, target_lang, on_back=None
     current_users = set()
 
     # --- Firebase 리스너 콜백 ---
+    # 화면에 표시한 메시지: Firebase 키 -> (말풍선, 메시지 데이터, 내 메시지 여부)
+    rendered_messages = {}
+    # 이미 처리한 메시지 키 (리스너 재연결/기록 재전송 시 다시 그리지 않음)
+    seen_message_keys = SeenKeys()
+
+    def update_bubble_translation(bubble, msg_data, translated, is_me, update=True):
+        """번역이 끝난 메시지의 말풍선을 번역문이 들어간 말풍선으로 교체합니다."""
+        if bubble not in chat_messages.controls:
+            return None
+        new_bubble = create_message_bubble(dict(msg_data, translated=translated), is_me)
+        if not new_bubble:
+            return None
+        setattr(new_bubble, 'timestamp', getattr(bubble, 'timestamp', msg_data.get('timestamp')))
+        setattr(new_bubble, 'message_key', getattr(bubble, 'message_key', None))
+        chat_messages.controls[chat_messages.controls.index(bubble)] = new_bubble
+        if update:
+            chat_messages.update()
+        return new_bubble
+
+    def apply_translation_patch(message_key, translated):
+        """Firebase에서 translated 필드가 채워지면 해당 메시지 말풍선을 교체합니다. (화면 갱신은 호출한 쪽에서)"""
+        bubble, msg_data, is_me = rendered_messages[message_key]
+        if not translated or translated == msg_data.get('translated'):
+            return False
+        new_bubble = update_bubble_translation(bubble, msg_data, translated, is_me, update=False)
+        if not new_bubble:
+            return False
+        rendered_messages[message_key] = (new_bubble, dict(msg_data, translated=translated), is_me)
+        return True
+
+    # 리스너 이벤트는 큐에 모았다가 MESSAGE_FRAME_INTERVAL마다 한 번의 page.update()로 반영
+    # 화면 반영은 공용 타이머 스케줄러가 아니라 세션 전용 스레드에서 하므로, 느린 화면이 다른 방의 타이머를 막지 않음
+    pending_events = deque()
+    event_cond = threading.Condition()
+    event_drain_state = {'thread': None}
+
     def on_message(event):
+        """Firebase 리스너 콜백: 이벤트를 큐에 넣고 세션의 화면 반영 스레드를 깨웁니다."""
         if not event or not event.data:
             return  # 데이터가 없으면 무시
+        if session_scope.closed:
+            return  # 이미 떠난 화면
+        with event_cond:
+            pending_events.append(event)
+            if event_drain_state['thread'] is None:
+                drain_thread = threading.Thread(target=run_message_drain, name=f"chat-drain-{room_id}", daemon=True)
+                event_drain_state['thread'] = drain_thread
+                drain_thread.start()
+            event_cond.notify()
+
+    def stop_message_drain():
+        with event_cond:
+            pending_events.clear()
+            event_drain_state['thread'] = None  # 스레드는 깨어나서 종료하고, 이후 이벤트는 새 스레드를 시작함
+            event_cond.notify_all()
+
+    def run_message_drain():
+        """세션 전용 화면 반영 스레드: 이벤트가 오면 MESSAGE_FRAME_INTERVAL 동안 더 모은 뒤 한 번에 반영합니다."""
+        current = threading.current_thread()
+        while True:
+            with event_cond:
+                while not pending_events and event_drain_state['thread'] is current:
+                    event_cond.wait()
+                if event_drain_state['thread'] is not current:
+                    return
+            time.sleep(MESSAGE_FRAME_INTERVAL)
+            drain_message_events(current)
+
+    def drain_message_events(drain_thread):
+        """쌓인 이벤트를 모두 말풍선으로 만든 뒤 화면을 한 번만 갱신합니다."""
+        with event_cond:
+            if event_drain_state['thread'] is not drain_thread:
+                return  # 그사이 중지됨
+            events = list(pending_events)
+            pending_events.clear()
+        changed = False
+        for event in events:
+            try:
+                changed = handle_message_event(event) or changed
+            except Exception as e:
+                print(f"메시지 처리 오류: {e}")
+                import traceback
+                traceback.print_exc()
+        if changed:
+            trim_message_window()
+            page.update()
+
+    def handle_message_event(event):
+        """리스너 이벤트 하나를 처리합니다. 화면에 변화가 있으면 True를 반환합니다."""
+        data = event.data
+        # 번역 완료 패치 (/<키>/translated 또는 /<키>에 {'translated': ...})
+        path_parts = [p for p in (getattr(event, 'path', '') or '').split('/') if p]
+        if path_parts and path_parts[0] in rendered_messages:
+            if len(path_parts) == 2 and path_parts[1] == 'translated':
+                return apply_translation_patch(path_parts[0], data)
+            if isinstance(data, dict) and 'translated' in data and 'text' not in data:
+                return apply_translation_patch(path_parts[0], data['translated'])
+        if isinstance(data, str):
+            import json
+            data = json.loads(data)
         
+        # 데이터가 유효한지 확인
+        if not isinstance(data, dict):
+            print(f"유효하지 않은 메시지 데이터 형식: {type(data)}")
+            return False
+        
+        # 처음 연결하면 루트('/')로 전체 기록이 한 번에 옴: 최근 HISTORY_WINDOW개만 키(push 키 = 시간순) 순서로 반영
+        if not path_parts and data and all(isinstance(v, dict) for v in data.values()):
+            message_keys = sorted(data)
+            # 구독 허브가 보내는 스냅샷은 최근 메시지만 담고 있으므로 창 크기만큼 차 있으면 이전 기록이 있다고 봄
+            if len(message_keys) >= HISTORY_WINDOW:
+                message_keys = message_keys[-HISTORY_WINDOW:]
+                window_state['has_older'] = True
+            changed = False
+            for message_key in message_keys:
+                changed = render_message(message_key, data[message_key]) or changed
+            return changed
+        if len(path_parts) != 1:
+            return False  # 메시지 하위 필드 변경은 번역 패치 외에는 무시
+        return render_message(path_parts[0], data)
+
+    # --- 메시지 창(window) 관리: 최근 메시지만 화면에 유지하고 이전 기록은 요청할 때 불러옴 ---
+    window_state = {'limit': HISTORY_WINDOW, 'oldest_key': None, 'has_older': False}
+
+    def trim_message_window():
+        """창 크기를 넘는 오래된 말풍선을 화면에서 제거합니다."""
+        controls = chat_messages.controls
+        if len(controls) <= window_state['limit']:
+            return
+        removed = controls[:len(controls) - window_state['limit']]
+        del controls[:len(removed)]
+        for control in removed:
+            message_key = getattr(control, 'message_key', None)
+            if message_key:
+                rendered_messages.pop(message_key, None)
+                window_state['has_older'] = True
+        window_state['oldest_key'] = next(
+            (getattr(c, 'message_key') for c in controls if getattr(c, 'message_key', None)), None
+        )
+        load_older_button.visible = can_load_older()
+
+    def can_load_older():
+        # 창이 HISTORY_MAX_WINDOW까지 늘어났으면 더 불러오지 않음 (불러온 만큼 다음 정리에서 잘려 나감)
+        return window_state['has_older'] and window_state['limit'] < HISTORY_MAX_WINDOW
+
+    def load_older_messages(e=None):
+        """현재 가장 오래된 메시지 이전 기록을 HISTORY_PAGE_SIZE개 불러와 맨 위에 붙입니다."""
+        oldest_key = window_state['oldest_key']
+        if not firebase_available or not oldest_key:
+            return
         try:
-            data = event.data
-            if isinstance(data, str):
-                import json
-                data = json.loads(data)
-            
-            # 데이터가 유효한지 확인
-            if not isinstance(data, dict):
-                print(f"유효하지 않은 메시지 데이터 형식: {type(data)}")
-                return
-            
-            msg_data = {
-                'text': data.get('text', ''),
-                'nickname': data.get('nickname', '익명'),
-                'timestamp': str(data.get('timestamp', '')),
-                'translated': data.get('translated', '')
-            }
-            
-            # 차단된 사용자의 메시지는 무시
-            if is_user_blocked(msg_data['nickname']):
-                print(f"차단된 사용자 {msg_data['nickname']}의 메시지 필터링됨")
-                return
-            
-            # 시스템 메시지면 무조건 가운데 정렬로 append
-            if msg_data['nickname'] == '시스템':
-                system_bubble = create_system_message_bubble(msg_data['text'])
-                if system_bubble:  # None이 아닌 경우만 추가
-                    chat_messages.controls.append(system_bubble)
-                    page.update()
-                return
-            
-            # 중복 메시지 방지: 최근 5개 메시지의 (nickname, text, timestamp)와 비교 (일반 메시지에만 적용)
-            def get_msg_id(msg):
-                return f"{msg['nickname']}|{msg['text']}|{msg['timestamp']}"
-            new_id = get_msg_id(msg_data)
-            for c in chat_messages.controls[-5:]:
-                if hasattr(c, 'content') and hasattr(c.content, 'controls'):
-                    try:
-                        last_nickname = c.content.controls[0].value
-                        last_text = c.content.controls[1].value
-                        last_timestamp = getattr(c, 'timestamp', None) or ''
-                        last_id = f"{last_nickname}|{last_text}|{last_timestamp}"
-                        if last_id == new_id:
-                            return  # 중복
-                    except Exception:
-                        continue
-            
-            # --- 입장/퇴장 감지 및 안내 메시지 ---
-            nickname = msg_data['nickname']
-            if nickname != '익명' and nickname != 'RAG' and nickname != '시스템':
-                # 입장 감지
-                if nickname not in current_users:
-                    current_users.add(nickname)
-                    # 다국어 시스템 메시지 사용
-                    system_texts = SYSTEM_MESSAGES.get(user_lang, SYSTEM_MESSAGES["ko"])
-                    join_text = system_texts["join"].format(nickname=nickname)
-                    join_bubble = create_system_message_bubble(join_text)
-                    if join_bubble:  # None이 아닌 경우만 추가
-                        chat_messages.controls.append(join_bubble)
-                        page.update()
-            
-            # 메시지 말풍선 생성
-            is_me = msg_data['nickname'] == (page.session.get('nickname') or '')
-            message_bubble = create_message_bubble(msg_data, is_me)
-            
-            # message_bubble이 유효한 경우에만 처리
-            if message_bubble:
-                setattr(message_bubble, 'timestamp', msg_data['timestamp'])
-                chat_messages.controls.append(message_bubble)
-                page.update()
-            else:
-                print(f"메시지 버블 생성 실패: {msg_data}")
-                
-        except Exception as e:
-            print(f"메시지 처리 오류: {e}")
-            import traceback
-            traceback.print_exc()
+            older = db.reference(f'rooms/{room_id}/messages').order_by_key() \
+                .end_at(oldest_key).limit_to_last(HISTORY_PAGE_SIZE + 1).get() or {}
+        except Exception as ex:
+            print(f"이전 메시지 불러오기 오류: {ex}")
+            return
+        message_keys = [k for k in sorted(older) if k != oldest_key and isinstance(older[k], dict)]
+        older_controls = []
+        for message_key in message_keys:
+            older_controls.extend(build_message_controls(message_key, older[message_key], live=False))
+        chat_messages.controls[0:0] = older_controls
+        window_state['limit'] = min(window_state['limit'] + len(older_controls), HISTORY_MAX_WINDOW)
+        if message_keys:
+            window_state['oldest_key'] = message_keys[0]
+        window_state['has_older'] = len(message_keys) >= HISTORY_PAGE_SIZE
+        load_older_button.visible = can_load_older()
+        page.update()
+
+    load_older_button = ft.TextButton(
+        SYSTEM_MESSAGES.get(user_lang, SYSTEM_MESSAGES["en"]).get("load_older", SYSTEM_MESSAGES["en"]["load_older"]),
+        icon=ft.Icons.HISTORY,
+        on_click=load_older_messages,
+        visible=False,
+    )
+
+    def render_message(message_key, data):
+        """메시지 하나를 말풍선으로 만들어 목록 끝에 추가합니다. (화면 갱신은 호출한 쪽에서)"""
+        controls = build_message_controls(message_key, data)
+        if not controls:
+            return False
+        chat_messages.controls.extend(controls)
+        # 새 메시지가 오면 auto_scroll로 맨 아래로 이동하므로, 불러온 이전 기록은 다음 정리에서 기본 창 크기로 줄임
+        window_state['limit'] = HISTORY_WINDOW
+        if message_key and window_state['oldest_key'] is None:
+            window_state['oldest_key'] = message_key
+        load_older_button.visible = can_load_older()
+        return True
+
+    def build_message_controls(message_key, data, live=True):
+        """Firebase 메시지 하나로 만들 말풍선 목록을 반환합니다. live면 입장 안내도 함께 만듭니다."""
+        # 중복 메시지 방지: push 키로 판단 (이전 기록은 창에서 잘려 나간 메시지도 다시 그릴 수 있음)
+        if live:
+            if not seen_message_keys.add(message_key):
+                return []
+        elif message_key in rendered_messages:
+            return []
+        
+        msg_data = {
+            'text': data.get('text', ''),
+            'nickname': data.get('nickname', '익명'),
+            'timestamp': str(data.get('timestamp', '')),
+            'translated': data.get('translated', '')
+        }
+        
+        # 차단된 사용자의 메시지는 무시
+        if is_user_blocked(msg_data['nickname'], room_id):
+            print(f"차단된 사용자 {msg_data['nickname']}의 메시지 필터링됨")
+            return []
+        
+        # 시스템 메시지면 무조건 가운데 정렬로 append
+        if msg_data['nickname'] == '시스템':
+            system_bubble = create_system_message_bubble(msg_data['text'])
+            if not system_bubble:  # None이면 추가하지 않음
+                return []
+            setattr(system_bubble, 'message_key', message_key)
+            return [system_bubble]
+        
+        controls = []
+        # --- 입장/퇴장 감지 및 안내 메시지 ---
+        nickname = msg_data['nickname']
+        if live and nickname != '익명' and nickname != 'RAG' and nickname != '시스템':
+            # 입장 감지
+            if nickname not in current_users:
+                current_users.add(nickname)
+                # 다국어 시스템 메시지 사용
+                system_texts = SYSTEM_MESSAGES.get(user_lang, SYSTEM_MESSAGES["ko"])
+                join_text = system_texts["join"].format(nickname=nickname)
+                join_bubble = create_system_message_bubble(join_text)
+                if join_bubble:  # None이 아닌 경우만 추가
+                    controls.append(join_bubble)
+        
+        # 메시지 말풍선 생성
+        is_me = msg_data['nickname'] == (page.session.get('nickname') or '')
+        message_bubble = create_message_bubble(msg_data, is_me)
+        
+        # message_bubble이 유효한 경우에만 처리
+        if message_bubble:
+            setattr(message_bubble, 'timestamp', msg_data['timestamp'])
+            setattr(message_bubble, 'message_key', message_key)
+            controls.append(message_bubble)
+            if message_key:
+                rendered_messages[message_key] = (message_bubble, msg_data, is_me)
+        else:
+            print(f"메시지 버블 생성 실패: {msg_data}")
+        return controls
 
     # --- 사용자 차단 함수 ---
     def block_user_from_message(nickname):
         """메시지에서 사용자 차단"""
         def confirm_block(e):
-            # 로컬 차단 목록에 추가
-            BLOCKED_USERS.add(nickname)
-            
-            # Firebase에 차단 정보 저장
-            try:
-                db.reference(f'rooms/{room_id}/blocked_users').child(nickname).set({
-                    'blocked_at': time.time(),
-                    'blocked_by': '방장'
-                })
-                print(f"사용자 {nickname} 차단됨 (방: {room_id})")
-            except Exception as e:
-                print(f"차단 정보 저장 오류: {e}")
+            # 공유 차단 목록과 Firebase에 저장
+            block_user(nickname, room_id)
             
                     # 차단 메시지 표시 (다국어)
             system_texts = SYSTEM_MESSAGES.get(user_lang, SYSTEM_MESSAGES["ko"])
@@ -1975,6 +2193,33 @@ def ChatRoomPage(page, room_id, room_title, user_lang, target_lang, on_back=None
     atexit.register(on_exit)
 
     # --- 메시지 전송 함수 ---
+    def create_streaming_answer_handler(placeholder_bubble):
+        """RAG 답변 조각이 도착할 때마다 말풍선을 갱신하는 콜백을 만듭니다. (화면 갱신은 STREAM_UPDATE_INTERVAL 간격으로 제한)"""
+        stream_state = {'text': '', 'bubble': placeholder_bubble, 'last_update': 0.0}
+
+        def on_chunk(text):
+            stream_state['text'] += text
+            now = time.time()
+            if now - stream_state['last_update'] < STREAM_UPDATE_INTERVAL:
+                return
+            stream_state['last_update'] = now
+            if stream_state['bubble'] not in chat_messages.controls:
+                return
+            partial_bubble = create_message_bubble({
+                'text': stream_state['text'],
+                'nickname': 'RAG',
+                'timestamp': now,
+                'translated': ''
+            }, False)
+            if not partial_bubble:
+                return
+            setattr(partial_bubble, 'timestamp', now)
+            chat_messages.controls[chat_messages.controls.index(stream_state['bubble'])] = partial_bubble
+            stream_state['bubble'] = partial_bubble
+            chat_messages.update()
+
+        return on_chunk, stream_state
+
     def send_message(e=None):
         if not input_box.value or not input_box.value.strip():
             return
@@ -2008,13 +2253,11 @@ def ChatRoomPage(page, room_id, room_title, user_lang, target_lang, on_back=None
         # 즉시 업데이트하여 입력 필드 반응성 향상
         input_box.update()
         
-        # 번역 처리
+        # 번역은 메시지를 먼저 보낸 뒤 백그라운드에서 처리 (완료되면 translated 필드를 채움)
         translated_text = ""
+        translate_lang = None
         if translate_switch and translate_switch.value and current_target_lang[0]:
-            try:
-                translated_text = translate_message(message_text, current_target_lang[0])
-            except Exception as e:
-                translated_text = f"[번역 오류: {e}]"
+            translate_lang = current_target_lang[0]
         
         # Firebase에 메시지 저장 (RAG 방이 아닐 때만)
         if firebase_available and custom_translate_message is None:
@@ -2025,7 +2268,14 @@ def ChatRoomPage(page, room_id, room_title, user_lang, target_lang, on_back=None
                     'timestamp': time.time(),
                     'translated': translated_text
                 }
-                db.reference(f'rooms/{room_id}/messages').push(message_data)
+                message_ref = db.reference(f'rooms/{room_id}/messages').push(message_data)
+                if translate_lang:
+                    def patch_translation(translated, message_ref=message_ref):
+                        try:
+                            message_ref.update({'translated': translated})
+                        except Exception as e:
+                            print(f"번역 저장 오류: {e}")
+                    translation_pipeline.submit(room_id, message_text, translate_lang, patch_translation)
             except Exception as e:
                 print(f"Firebase 저장 오류: {e}")
         
@@ -2044,6 +2294,12 @@ def ChatRoomPage(page, room_id, room_title, user_lang, target_lang, on_back=None
                 chat_messages.controls.append(user_bubble)
                 # 성능 최적화: 개별 컨트롤 업데이트
                 chat_messages.update()
+                if translate_lang:
+                    translation_pipeline.submit(
+                        room_id, message_text, translate_lang,
+                        lambda translated, bubble=user_bubble, data=user_msg_data: update_bubble_translation(bubble, data, translated, True),
+                        owner=session_scope
+                    )
             
             # RAG 답변 추가 (더 안전한 처리)
             try:
@@ -2065,7 +2321,10 @@ def ChatRoomPage(page, room_id, room_title, user_lang, target_lang, on_back=None
                 
                 # 모든 RAG 방에서 선택된 언어로 답변 생성
                 selected_lang = current_target_lang[0] if current_target_lang[0] else user_lang
-                rag_answer = custom_translate_message(message_text, selected_lang)
+                on_chunk, stream_state = create_streaming_answer_handler(loading_bubble)
+                rag_answer = custom_translate_message(message_text, selected_lang, on_chunk=on_chunk)
+                # 스트리밍 중 교체된 말풍선을 최종 답변으로 바꿈
+                loading_bubble = stream_state['bubble']
                 
                 # 로딩 메시지 위치에 답변을 insert (replace)
                 idx = chat_messages.controls.index(loading_bubble)
@@ -2089,6 +2348,8 @@ def ChatRoomPage(page, room_id, room_title, user_lang, target_lang, on_back=None
             except Exception as e:
                 print(f'RAG 답변 오류: {e}')
                 try:
+                    if 'stream_state' in locals():
+                        loading_bubble = stream_state['bubble']
                     if 'loading_bubble' in locals():
                         chat_messages.controls.remove(loading_bubble)
                 except:
@@ -2121,6 +2382,12 @@ def ChatRoomPage(page, room_id, room_title, user_lang, target_lang, on_back=None
                 chat_messages.controls.append(user_bubble)
                 # 성능 최적화: 개별 컨트롤 업데이트
                 chat_messages.update()
+                if translate_lang:
+                    translation_pipeline.submit(
+                        room_id, message_text, translate_lang,
+                        lambda translated, bubble=user_bubble, data=user_msg_data: update_bubble_translation(bubble, data, translated, True),
+                        owner=session_scope
+                    )
             
             try:
                 # 로딩 메시지를 사용자 메시지 다음에 추가
@@ -2140,7 +2407,10 @@ def ChatRoomPage(page, room_id, room_title, user_lang, target_lang, on_back=None
                 
                 # RAG 답변 생성 (선택된 언어로)
                 selected_lang = current_target_lang[0] if current_target_lang[0] else user_lang
-                rag_answer = custom_translate_message(message_text, selected_lang)
+                on_chunk, stream_state = create_streaming_answer_handler(loading_bubble)
+                rag_answer = custom_translate_message(message_text, selected_lang, on_chunk=on_chunk)
+                # 스트리밍 중 교체된 말풍선을 최종 답변으로 바꿈
+                loading_bubble = stream_state['bubble']
                 
                 # 로딩 메시지 제거
                 chat_messages.controls.remove(loading_bubble)
@@ -2164,6 +2434,8 @@ def ChatRoomPage(page, room_id, room_title, user_lang, target_lang, on_back=None
                 print(f'RAG 답변 오류: {e}')
                 # 로딩 메시지가 있다면 제거
                 try:
+                    if 'stream_state' in locals():
+                        loading_bubble = stream_state['bubble']
                     if 'loading_bubble' in locals():
                         chat_messages.controls.remove(loading_bubble)
                 except:
@@ -2185,15 +2457,32 @@ def ChatRoomPage(page, room_id, room_title, user_lang, target_lang, on_back=None
 
     # --- 뒤로가기 함수 ---
     def go_back(e):
+        # 이 방에서 연 리스너/타이머/번역 작업 정리
+        session_scope.close()
         if on_back:
             on_back(e)
 
+    # --- 세션 자원 등록 (방을 떠나거나 브라우저 연결이 끊기면 한 번에 정리) ---
+    session_scope = get_session_manager().open_scope(page, 'chat_room')
+
+    def close_room_subscription():
+        if firebase_listener:
+            firebase_listener.close()
+
+    session_scope.add('room_subscription', close_room_subscription)
+    session_scope.add('message_drain', stop_message_drain)
+    session_scope.add('translation_tasks', lambda: translation_pipeline.cancel(session_scope))
+    session_scope.add('atexit_handler', lambda: atexit.unregister(on_exit))
+
     # --- Firebase 리스너 설정 ---
     firebase_listener = None  # 리스너 객체 저장용 변수
     if firebase_available:
         try:
-            # Firebase 리스너 설정
-            firebase_listener = db.reference(f'rooms/{room_id}/messages').listen(on_message)
+            # 방의 차단 목록 구독 (같은 방의 모든 세션이 공유)
+            blocked_users_watch = get_blocked_user_cache().watch(room_id)
+            session_scope.add('blocked_users_watch', blocked_users_watch.close)
+            # Firebase 리스너 설정 (같은 방의 세션들이 리스너 하나를 공유)
+            firebase_listener = get_room_hub().subscribe(room_id, on_message)
         except Exception as e:
             print(f"Firebase 리스너 설정 오류: {e}")
 
@@ -2358,14 +2647,8 @@ def ChatRoomPage(page, room_id, room_title, user_lang, target_lang, on_back=None
         # 차단된 사용자 목록 가져오기 (방장만)
         blocked_list = []
         if is_owner:
-            try:
-                blocked_ref = db.reference(f'rooms/{room_id}/blocked_users')
-                blocked_data = blocked_ref.get()
-                if blocked_data:
-                    for nickname, data in blocked_data.items():
-                        blocked_list.append(nickname)
-            except:
-                pass
+            # 리스너로 갱신되는 공유 캐시에서 조회 (Firebase 재조회 없음)
+            blocked_list = get_blocked_user_cache().get_blocked(room_id)
         
         # 설정 다이얼로그 내용
         settings_content = ft.Column([
@@ -2488,6 +2771,9 @@ def ChatRoomPage(page, room_id, room_title, user_lang, target_lang, on_back=None
                 
                 # 화면 메시지 초기화
                 chat_messages.controls.clear()
+                rendered_messages.clear()
+                window_state.update(limit=HISTORY_WINDOW, oldest_key=None, has_older=False)
+                load_older_button.visible = False
                 
                 # 현재 사용자 목록도 초기화 (입장/퇴장 메시지 방지)
                 current_users.clear()
@@ -2499,7 +2785,7 @@ def ChatRoomPage(page, room_id, room_title, user_lang, target_lang, on_back=None
                     except:
                         pass
                     # 새 리스너 설정
-                    firebase_listener = db.reference(f'rooms/{room_id}/messages').listen(on_message)
+                    firebase_listener = get_room_hub().subscribe(room_id, on_message)
                 
                 # 페이지 업데이트
                 page.update()
@@ -2604,19 +2890,24 @@ def ChatRoomPage(page, room_id, room_title, user_lang, target_lang, on_back=None
     # AlertDialog 미리 생성
     mic_dialog = ft.AlertDialog(title=ft.Text(""), modal=True)
 
+    mic_dialog_timer = {'handle': None}
+
+    def close_mic_dialog():
+        mic_dialog.open = False
+        page.update()
+
     def focus_input_box(e):
         input_box.focus()
         guide_text = MIC_GUIDE_TEXTS.get(user_lang, MIC_GUIDE_TEXTS["en"])
         mic_dialog.title = ft.Text(guide_text)
         mic_dialog.open = True
         page.update()
-        # 3초 후 자동 닫힘
-        def close_dialog():
-            import time
-            time.sleep(3)
-            mic_dialog.open = False
-            page.update()
-        threading.Thread(target=close_dialog, daemon=True).start()
+        # 3초 후 자동 닫힘 (다시 누르면 이전 예약은 취소하고 새로 3초)
+        if mic_dialog_timer['handle']:
+            mic_dialog_timer['handle'].cancel()
+        mic_dialog_timer['handle'] = get_scheduler().call_later(3, close_mic_dialog)
+
+    session_scope.add('mic_dialog_timer', lambda: mic_dialog_timer['handle'] and mic_dialog_timer['handle'].cancel())
 
     # 입력 영역 (성능 최적화)
     input_row = ft.Row([
@@ -2673,7 +2964,7 @@ def ChatRoomPage(page, room_id, room_title, user_lang, target_lang, on_back=None
         )
     else:
         chat_column = ft.Column(
-            controls=[chat_messages],
+            controls=[load_older_button, chat_messages],
             expand=True,
             scroll=ft.ScrollMode.ALWAYS
         )
@@ -2698,25 +2989,25 @@ def ChatRoomPage(page, room_id, room_title, user_lang, target_lang, on_back=None
             return
         try:
             messages_ref = db.reference(f'rooms/{room_id}/messages')
-            messages = messages_ref.get()
-            import time
             now = time.time()
-            # 1. 방장(최초 입장자)만 예외 처리: 방에 메시지가 0개이고, 내가 방을 만든 사람일 때만 return
-            if not messages or len(messages) == 0:
-                # 방장 여부는 room_id 생성 직후 바로 입장하는 경우로 추정 (정확히 하려면 DB에 생성자 정보 필요)
-                # 일단 최초 입장자만 안내 메시지 push 안 함
+            # 1. 방에 메시지가 하나도 없으면(최초 입장자) 안내 메시지 push 안 함 (마지막 1개만 조회)
+            if not messages_ref.order_by_key().limit_to_last(1).get():
                 return
-            # 2. 최근 2분 내 같은 닉네임의 시스템 메시지가 이미 있으면 push 안 함
+            # 2. 최근 JOIN_DEDUP_WINDOW초 안에 같은 닉네임의 입장 안내가 있었으면 push 안 함
+            #    (닉네임별 마지막 입장 시각을 presence 노드에 트랜잭션으로 기록해 여러 탭이 동시에 들어와도 한 번만 push)
+            presence_ref = db.reference(f'rooms/{room_id}/presence/{to_presence_key(nickname)}')
+            join_state = {'claimed': False}
+            def claim_join(current):
+                last_join = current.get('joined_at', 0) if isinstance(current, dict) else 0
+                join_state['claimed'] = now - float(last_join or 0) >= JOIN_DEDUP_WINDOW
+                if not join_state['claimed']:
+                    return current
+                return {'nickname': nickname, 'joined_at': now}
+            presence_ref.transaction(claim_join)
+            if not join_state['claimed']:
+                return  # 중복 방지
+            # 3. 안내 메시지 push
             system_texts = SYSTEM_MESSAGES.get(user_lang, SYSTEM_MESSAGES["ko"])
-            join_text_pattern = system_texts["join"].format(nickname=nickname)
-            for msg in messages.values():
-                if (
-                    msg.get('nickname') == '시스템'
-                    and msg.get('text', '').startswith(join_text_pattern)
-                    and now - float(msg.get('timestamp', 0)) < 120
-                ):
-                    return  # 중복 방지
-            # 3. 안내 메시지 push (메시지 1개 이상이면 무조건 push)
             join_text = system_texts["join"].format(nickname=nickname)
             system_msg = {
                 'text': join_text,
@@ -2786,10 +3077,8 @@ def ChatRoomPage(page, room_id, room_title, user_lang, target_lang, on_back=None
         # 차단 버튼 (방장이고, 자신의 메시지가 아니고, 시스템/RAG 메시지가 아닐 때만 표시)
         block_button = None
         if not is_me and nickname not in ['시스템', 'RAG', '익명']:
-            # 방장 권한 확인
-            current_nickname = page.session.get('nickname') or ''
-            current_user_id = page.session.get('user_id')
-            if is_room_owner(room_id, current_nickname, current_user_id):
+            # 방장 권한 확인 (화면을 열 때 한 번 확인한 값)
+            if is_current_owner:
                 block_button = ft.IconButton(
                     icon=ft.Icons.BLOCK,
                     icon_color=ft.Colors.RED_400,
@@ -2867,41 +3156,31 @@ if firebase_key_json:
     with open("firebase_key.json", "w", encoding="utf-8") as f:
         f.write(firebase_key_json)
 
-# 차단된 사용자 목록 (세션별로 관리)
-BLOCKED_USERS = set()
-
+# 차단된 사용자 목록은 방별로 프로세스 전체에서 공유 (blocked_user_cache 참고)
 def block_user(nickname, room_id):
     """사용자 차단"""
-    BLOCKED_USERS.add(nickname)
-    # Firebase에 차단 정보 저장
     try:
-        db.reference(f'rooms/{room_id}/blocked_users').child(nickname).set({
-            'blocked_at': time.time(),
-            'blocked_by': '방장'
-        })
-        print(f"사용자 {nickname} 차단됨")
+        get_blocked_user_cache().block(room_id, nickname)
+        print(f"사용자 {nickname} 차단됨 (방: {room_id})")
     except Exception as e:
         print(f"차단 정보 저장 오류: {e}")
 
 def unblock_user(nickname, room_id):
     """사용자 차단 해제"""
-    BLOCKED_USERS.discard(nickname)
-    # Firebase에서 차단 정보 삭제
     try:
-        db.reference(f'rooms/{room_id}/blocked_users').child(nickname).delete()
+        get_blocked_user_cache().unblock(room_id, nickname)
         print(f"사용자 {nickname} 차단 해제됨")
     except Exception as e:
         print(f"차단 해제 오류: {e}")
 
-def is_user_blocked(nickname):
+def is_user_blocked(nickname, room_id):
     """사용자가 차단되었는지 확인"""
-    return nickname in BLOCKED_USERS
+    return get_blocked_user_cache().is_blocked(room_id, nickname)
 
 def is_room_owner(room_id, nickname, user_id=None):
     """방장인지 확인"""
     try:
-        room_ref = db.reference(f'/rooms/{room_id}')
-        room_data = room_ref.get()
+        room_data = get_room_meta(room_id)
         if room_data:
             # 닉네임으로 확인
             if room_data.get('created_by') == nickname:
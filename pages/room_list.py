@@ -1,6 +1,7 @@
 import flet as ft
 from firebase_admin import db
 import time
+from room_meta_cache import get_room_meta_cache
 
 def RoomListPage(page, lang="ko", on_select=None, on_back=None):
     # 화면 크기에 따른 반응형 설정
@@ -153,8 +154,8 @@ def RoomListPage(page, lang="ko", on_select=None, on_back=None):
     def load_rooms():
         """Firebase에서 채팅방 목록을 로드"""
         try:
-            rooms_ref = db.reference('/rooms')
-            rooms_data = rooms_ref.get()
+            # 방 메타데이터만 조회 (각 방의 messages 하위 트리는 내려받지 않음)
+            rooms_data = get_room_meta_cache().list_rooms()
     
             if not rooms_data:
                 return [], []
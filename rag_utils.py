@@ -6,126 +6,56 @@ import numpy as np
 import re
 import google.generativeai as genai
 import shutil
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pypdf import PdfReader
+from embedding_cache import get_query_embedding_cache
+from language_detector import detect_language
+from keyword_matcher import KeywordMatcher
+from answer_cache import get_answer_cache
+import llm_client
+from llm_client import generate_text
 
 PDF_PATH = "pdf/ban.pdf"
 VECTOR_DB_PATH = "vector_db.pkl"
 CACHE_INFO_PATH = "cache_info.json"
 
-# 언어 감지 함수
-def detect_language(text):
-    """텍스트의 언어를 감지합니다."""
-    # 한글 패턴
-    korean_pattern = re.compile(r'[가-힣]')
-    # 영어 패턴
-    english_pattern = re.compile(r'[a-zA-Z]')
-    # 일본어 패턴 (히라가나, 카타카나)
-    japanese_pattern = re.compile(r'[あ-んア-ン]')
-    # 중국어 패턴 (간체, 번체)
-    chinese_pattern = re.compile(r'[\u4e00-\u9fff]')
-    # 베트남어 패턴
-    vietnamese_pattern = re.compile(r'[àáạảãâầấậẩẫăằắặẳẵèéẹẻẽêềếệểễìíịỉĩòóọỏõôồốộổỗơờớợởỡùúụủũưừứựửữỳýỵỷỹđ]')
-    # 프랑스어 패턴
-    french_pattern = re.compile(r'[àâäéèêëïîôöùûüÿç]')
-    # 독일어 패턴
-    german_pattern = re.compile(r'[äöüß]')
-    # 태국어 패턴
-    thai_pattern = re.compile(r'[\u0e00-\u0e7f]')
-    
-    text_lower = text.lower()
-    
-    # 우즈벡어 패턴 (키릴 문자)
-    uzbek_pattern = re.compile(r'[а-яА-ЯёЁ]')
-    # 네팔어 패턴 (데바나가리 문자)
-    nepali_pattern = re.compile(r'[\u0900-\u097F]')
-    # 동티모르어 패턴 (라틴 문자 기반)
-    tetum_pattern = re.compile(r'[àáâãäåæçèéêëìíîïñòóôõöùúûüýÿ]')
-    # 라오스어 패턴 (라오 문자)
-    lao_pattern = re.compile(r'[\u0E80-\u0EFF]')
-    # 몽골어 패턴 (키릴 문자)
-    mongolian_pattern = re.compile(r'[а-яА-ЯёЁ]')
-    # 미얀마어 패턴 (버마 문자)
-    burmese_pattern = re.compile(r'[\u1000-\u109F]')
-    # 벵골어 패턴 (벵골 문자)
-    bengali_pattern = re.compile(r'[\u0980-\u09FF]')
-    # 스리랑카어 패턴 (싱할라 문자)
-    sinhala_pattern = re.compile(r'[\u0D80-\u0DFF]')
-    # 캄보디아어 패턴 (크메르 문자)
-    khmer_pattern = re.compile(r'[\u1780-\u17FF]')
-    # 키르기스어 패턴 (키릴 문자)
-    kyrgyz_pattern = re.compile(r'[а-яА-ЯёЁ]')
-    # 우르두어 패턴 (아랍 문자)
-    urdu_pattern = re.compile(r'[\u0600-\u06FF]')
-    
-    # 각 언어별 점수 계산
-    scores = {
-        'ko': len(korean_pattern.findall(text)),
-        'en': len(english_pattern.findall(text)),
-        'ja': len(japanese_pattern.findall(text)),
-        'zh': len(chinese_pattern.findall(text)),
-        'vi': len(vietnamese_pattern.findall(text)),
-        'fr': len(french_pattern.findall(text)),
-        'de': len(german_pattern.findall(text)),
-        'th': len(thai_pattern.findall(text)),
-        'uz': len(uzbek_pattern.findall(text)),
-        'ne': len(nepali_pattern.findall(text)),
-        'tet': len(tetum_pattern.findall(text)),
-        'lo': len(lao_pattern.findall(text)),
-        'mn': len(mongolian_pattern.findall(text)),
-        'my': len(burmese_pattern.findall(text)),
-        'bn': len(bengali_pattern.findall(text)),
-        'si': len(sinhala_pattern.findall(text)),
-        'km': len(khmer_pattern.findall(text)),
-        'ky': len(kyrgyz_pattern.findall(text)),
-        'ur': len(urdu_pattern.findall(text))
-    }
+def is_waste_related_query(query):
+    """질문이 쓰레기 처리 관련인지 확인합니다."""
+    return WASTE_KEYWORD_MATCHER.contains_any(query)
+
+# 다양한 형태의 구군명 패턴 (같은 길이로 겹치면 앞쪽 패턴이 우선)
+DISTRICT_PATTERNS = [
+    # 정확한 매칭
+    ("해운대구", "해운대구"), ("부산진구", "부산진구"), ("동래구", "동래구"), ("영도구", "영도구"),
+    ("금정구", "금정구"), ("강서구", "강서구"), ("연제구", "연제구"), ("수영구", "수영구"),
+    ("사상구", "사상구"), ("기장군", "기장군"), ("중구", "중구"), ("서구", "서구"), 
+    ("동구", "동구"), ("남구", "남구"), ("북구", "북구"), ("사하구", "사하구"),
     
-    # 가장 높은 점수의 언어 반환
-    detected_lang = max(scores, key=scores.get)
+    # 영어 매칭
+    ("haeundae-gu", "해운대구"), ("busanjin-gu", "부산진구"), ("dongrae-gu", "동래구"), ("yeongdo-gu", "영도구"),
+    ("geumjeong-gu", "금정구"), ("gangseo-gu", "강서구"), ("yeonje-gu", "연제구"), ("suyeong-gu", "수영구"),
+    ("sasang-gu", "사상구"), ("gijang-gun", "기장군"), ("jung-gu", "중구"), ("seo-gu", "서구"),
+    ("dong-gu", "동구"), ("nam-gu", "남구"), ("buk-gu", "북구"), ("saha-gu", "사하구"),
     
-    # 점수가 0이면 기본값으로 영어 반환
-    if scores[detected_lang] == 0:
-        return 'en'
+    # 부분 매칭 (구/군 생략)
+    ("해운대", "해운대구"), ("부산진", "부산진구"), ("동래", "동래구"), ("영도", "영도구"),
+    ("금정", "금정구"), ("강서", "강서구"), ("연제", "연제구"), ("수영", "수영구"),
+    ("사상", "사상구"), ("기장", "기장군"),
     
-    return detected_lang
+    # 단순 매칭
+    ("중", "중구"), ("서", "서구"), ("동", "동구"), ("남", "남구"), ("북", "북구"), ("사하", "사하구")
+]
 
-def is_waste_related_query(query):
-    """질문이 쓰레기 처리 관련인지 확인합니다."""
-    query_lower = query.lower()
-    return any(keyword in query_lower for keyword in WASTE_KEYWORDS)
+DISTRICT_MATCHER = KeywordMatcher(DISTRICT_PATTERNS)
 
 def extract_district_from_query(query):
-    """질문에서 구군명을 추출합니다."""
-    query_lower = query.lower()
-    
-    # 다양한 형태의 구군명 매칭 (더 구체적인 매칭이 우선되도록 순서 조정)
-    district_mappings = [
-        # 정확한 매칭 (가장 우선)
-        ("해운대구", "해운대구"), ("부산진구", "부산진구"), ("동래구", "동래구"), ("영도구", "영도구"),
-        ("금정구", "금정구"), ("강서구", "강서구"), ("연제구", "연제구"), ("수영구", "수영구"),
-        ("사상구", "사상구"), ("기장군", "기장군"), ("중구", "중구"), ("서구", "서구"), 
-        ("동구", "동구"), ("남구", "남구"), ("북구", "북구"), ("사하구", "사하구"),
-        
-        # 영어 매칭
-        ("haeundae-gu", "해운대구"), ("busanjin-gu", "부산진구"), ("dongrae-gu", "동래구"), ("yeongdo-gu", "영도구"),
-        ("geumjeong-gu", "금정구"), ("gangseo-gu", "강서구"), ("yeonje-gu", "연제구"), ("suyeong-gu", "수영구"),
-        ("sasang-gu", "사상구"), ("gijang-gun", "기장군"), ("jung-gu", "중구"), ("seo-gu", "서구"),
-        ("dong-gu", "동구"), ("nam-gu", "남구"), ("buk-gu", "북구"), ("saha-gu", "사하구"),
-        
-        # 부분 매칭 (구/군 포함, 더 구체적인 것 우선)
-        ("해운대", "해운대구"), ("부산진", "부산진구"), ("동래", "동래구"), ("영도", "영도구"),
-        ("금정", "금정구"), ("강서", "강서구"), ("연제", "연제구"), ("수영", "수영구"),
-        ("사상", "사상구"), ("기장", "기장군"),
-        
-        # 단순 매칭 (마지막 우선순위)
-        ("중", "중구"), ("서", "서구"), ("동", "동구"), ("남", "남구"), ("북", "북구"), ("사하", "사하구")
-    ]
-    
-    for pattern, district in district_mappings:
-        if pattern in query_lower:
-            print(f"  - 구군명 패턴 매칭: '{pattern}' → '{district}'")
-            return district
-    
+    """질문에서 구군명을 추출합니다. 가장 긴 패턴이 우선합니다 (예: '동래' > '동')."""
+    match = DISTRICT_MATCHER.longest_match(query)
+    if match:
+        print(f"  - 구군명 패턴 매칭: '{match.keyword}' → '{match.value}'")
+        return match.value
     return None
 
 def get_district_selection_prompt(target_lang):
@@ -371,6 +301,8 @@ WASTE_KEYWORDS = [
     "쓰레기신고", "폐기물신고", "대형폐기물신고", "쓰레기수거신고", "폐기물수거신고"
 ]
 
+WASTE_KEYWORD_MATCHER = KeywordMatcher(WASTE_KEYWORDS)
+
 # 언어별 오류 메시지
 ERROR_MESSAGES = {
     'ko': {
@@ -540,56 +472,271 @@ def chunk_pdf_to_text_chunks(pdf_path, chunk_size=1000, chunk_overlap=100):
 
 # Gemini 임베딩 클래스
 class GeminiEmbeddings:
+    # embed_content 한 번에 보낼 수 있는 최대 텍스트 수
+    BATCH_SIZE = 100
+    MAX_WORKERS = 4
+    MAX_RETRIES = 5
+
     def __init__(self, gemini_api_key, model="models/embedding-001"):
         self.api_key = gemini_api_key
         self.model = model
-        genai.configure(api_key=gemini_api_key)
+        llm_client.configure(gemini_api_key)
 
     def embed_query(self, text):
-        response = genai.embed_content(model=self.model, content=text, task_type="retrieval_query")
-        return response["embedding"]
-
-    def embed_documents(self, texts):
+        """질의 임베딩을 반환합니다. 같은 질문은 공유 캐시에서 바로 가져옵니다."""
+        return get_query_embedding_cache().get_or_compute(
+            text, self.model, "retrieval_query",
+            lambda: genai.embed_content(model=self.model, content=text, task_type="retrieval_query")["embedding"]
+        )
+
+    def embed_documents(self, texts, batch_size=None, max_workers=None):
+        """여러 텍스트를 배치로 묶어 제한된 개수만큼 동시에 임베딩합니다."""
+        texts = list(texts)
+        if not texts:
+            return []
+        batch_size = batch_size or self.BATCH_SIZE
+        max_workers = max_workers or self.MAX_WORKERS
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        results = [None] * len(batches)
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(batches))) as executor:
+            futures = {executor.submit(self._embed_batch, batch): idx for idx, batch in enumerate(batches)}
+            done = 0
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+                done += 1
+                if len(batches) > 1:
+                    print(f"  임베딩 배치 {done}/{len(batches)} 완료")
         embeddings = []
-        for text in texts:
-            response = genai.embed_content(model=self.model, content=text, task_type="retrieval_document")
-            embeddings.append(response["embedding"])
+        for batch_embeddings in results:
+            embeddings.extend(batch_embeddings)
         return embeddings
 
+    def _embed_batch(self, batch):
+        """배치 하나를 임베딩하고, 요청 한도 초과 시 지수 백오프로 재시도합니다."""
+        delay = 1.0
+        for attempt in range(self.MAX_RETRIES + 1):
+            try:
+                response = genai.embed_content(model=self.model, content=batch, task_type="retrieval_document")
+                return response["embedding"]
+            except Exception as e:
+                if attempt == self.MAX_RETRIES or not _is_rate_limit_error(e):
+                    raise
+                wait = delay + random.uniform(0, delay)
+                print(f"⚠️ 임베딩 요청 한도 초과, {wait:.1f}초 후 재시도 ({attempt + 1}/{self.MAX_RETRIES})")
+                time.sleep(wait)
+                delay = min(delay * 2, 60.0)
+
+def _is_rate_limit_error(error):
+    """Gemini API의 요청 한도 초과(429) 오류인지 예외 타입/상태 코드로 확인합니다.
+    일일 할당량 소진이나 설정 오류처럼 메시지에 'quota'만 들어간 오류는 재시도하지 않습니다."""
+    if type(error).__name__ in ("ResourceExhausted", "TooManyRequests"):
+        return True
+    for attr in ("code", "status_code"):
+        code = getattr(error, attr, None)
+        if callable(code):
+            # grpc.RpcError는 code()가 메서드
+            continue
+        try:
+            if code is not None and int(code) == 429:
+                return True
+        except (TypeError, ValueError):
+            pass
+    return False
+
+# 메타데이터 역색인을 만드는 필드 (필드, 값) -> 문서 id 목록
+INDEXED_METADATA_FIELDS = ('category', 'gu_name', 'type')
+
+def build_metadata_index(documents):
+    """문서 목록에서 (필드, 값) -> 문서 id 목록 역색인을 만듭니다."""
+    index = {}
+    for doc_id, doc in enumerate(documents):
+        if not isinstance(doc, dict) or not isinstance(doc.get('metadata'), dict):
+            continue
+        metadata = doc['metadata']
+        for field in INDEXED_METADATA_FIELDS:
+            value = metadata.get(field)
+            if value is not None:
+                index.setdefault((field, value), []).append(doc_id)
+    return index
+
 # SimpleVectorDB는 동일하게 사용 (임베딩 객체만 교체)
 class SimpleVectorDB:
     def __init__(self, documents, embeddings=None, doc_embeddings=None):
         self.documents = documents
         self.embeddings = embeddings
         self.doc_embeddings = doc_embeddings
-
-    def similarity_search(self, query, k=3):
+        self._build_metadata_index()
+
+    @property
+    def doc_embeddings(self):
+        """문서 임베딩 (행 정규화된 float32 행렬, 원본 목록은 따로 보관하지 않음)"""
+        return self._matrix
+
+    @doc_embeddings.setter
+    def doc_embeddings(self, value):
+        self._matrix = self._build_matrix(value)
+
+    def _build_metadata_index(self):
+        """(필드, 값)별 문서 id 역색인을 로드 시점에 한 번 만듭니다."""
+        self._metadata_index = build_metadata_index(self.documents)
+
+    def find_document_ids(self, **filters):
+        """모든 메타데이터 조건(field=value)을 만족하는 문서 id를 오름차순으로 반환합니다."""
+        result = None
+        for field, value in filters.items():
+            if field not in INDEXED_METADATA_FIELDS:
+                raise ValueError(f"색인되지 않은 메타데이터 필드입니다: {field}")
+            ids = self._metadata_index.get((field, value), [])
+            result = set(ids) if result is None else result.intersection(ids)
+            if not result:
+                return []
+        if result is None:
+            return list(range(len(self.documents)))
+        return sorted(result)
+
+    def find_documents(self, **filters):
+        return [self.documents[i] for i in self.find_document_ids(**filters)]
+
+    def content_hash(self):
+        """문서 수와 임베딩 행렬로 만든 내용 해시입니다. (답변 캐시 무효화에 사용)"""
+        if getattr(self, '_content_hash', None) is None:
+            digest = hashlib.md5(str(len(self.documents)).encode())
+            if self._matrix is not None:
+                for start in range(0, len(self._matrix), 4096):
+                    digest.update(np.ascontiguousarray(self._matrix[start:start + 4096]).tobytes())
+            else:
+                for text in self.document_texts():
+                    digest.update(text.encode('utf-8'))
+            self._content_hash = digest.hexdigest()
+        return self._content_hash
+
+    @staticmethod
+    def _build_matrix(doc_embeddings):
+        """문서 임베딩을 행 정규화된 float32 행렬로 한 번만 변환합니다."""
+        if doc_embeddings is None or len(doc_embeddings) == 0:
+            return None
+        # 넘겨받은 배열을 건드리지 않도록 복사본을 정규화합니다
+        matrix = np.array(doc_embeddings, dtype=np.float32, copy=True, order='C')
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix /= norms
+        return matrix
+
+    def similarity_search(self, query, k=3, filters=None):
+        """질의와 가장 유사한 문서 k개를 반환합니다. filters가 있으면 해당 메타데이터 문서 안에서만 순위를 매깁니다."""
+        candidate_ids = self.find_document_ids(**filters) if filters else None
         if self.embeddings is None:
             print("임베딩 객체가 없습니다. 새로 생성합니다...")
+            if candidate_ids is not None:
+                return [self.documents[i] for i in candidate_ids[:k]]
             return self.documents[:k]
+        if self._matrix is None:
+            # 질의 경로에서는 문서 임베딩을 절대 생성하지 않습니다 (load_vector_db에서 미리 준비)
+            raise RuntimeError("문서 임베딩이 없는 벡터DB입니다. load_vector_db()로 로드하세요.")
+        if candidate_ids is not None and not candidate_ids:
+            return []
         query_embedding = self.embeddings.embed_query(query)
-        doc_texts = [doc['page_content'] if isinstance(doc, dict) and 'page_content' in doc else str(doc) for doc in self.documents]
-        doc_embeddings = self.doc_embeddings or self.embeddings.embed_documents(doc_texts)
-        similarities = [np.dot(query_embedding, doc_emb) / (np.linalg.norm(query_embedding) * np.linalg.norm(doc_emb)) for doc_emb in doc_embeddings]
-        top_indices = np.argsort(similarities)[-k:][::-1]
+        top_indices = self._top_k(query_embedding, k, candidate_ids)
         return [self.documents[i] for i in top_indices]
+
+    def document_texts(self):
+        return [doc['page_content'] if isinstance(doc, dict) and 'page_content' in doc else str(doc) for doc in self.documents]
+
+    def _top_k(self, query_embedding, k, candidate_ids=None):
+        """행렬-벡터 곱 한 번으로 코사인 유사도 상위 k개 인덱스를 반환합니다."""
+        query_vec = np.asarray(query_embedding, dtype=np.float32)
+        query_norm = np.linalg.norm(query_vec)
+        if query_norm == 0:
+            return []
+        if candidate_ids is not None:
+            candidate_ids = np.asarray(candidate_ids)
+            scores = self._matrix[candidate_ids] @ (query_vec / query_norm)
+            return candidate_ids[self._rank(scores, k)].tolist()
+        scores = self._matrix @ (query_vec / query_norm)
+        return self._rank(scores, k).tolist()
+
+    @staticmethod
+    def _rank(scores, k):
+        """점수 배열에서 상위 k개 위치를 점수 내림차순으로 반환합니다."""
+        k = min(k, len(scores))
+        if k <= 0:
+            return np.array([], dtype=np.int64)
+        if k < len(scores):
+            candidates = np.argpartition(scores, -k)[-k:]
+        else:
+            candidates = np.arange(len(scores))
+        return candidates[np.argsort(scores[candidates])[::-1]]
+
     def __getstate__(self):
         state = self.__dict__.copy()
         state['embeddings'] = None
+        # 정규화된 행렬을 doc_embeddings 이름으로 저장 (이전 피클과 같은 형식)
+        state['doc_embeddings'] = state.pop('_matrix', None)
+        state.pop('_metadata_index', None)
+        state.pop('_content_hash', None)
         return state
     def __setstate__(self, state):
+        doc_embeddings = state.pop('doc_embeddings', None)
         self.__dict__.update(state)
+        self.doc_embeddings = doc_embeddings
+        self._build_metadata_index()
 
 # 2. 임베딩 및 벡터DB 저장/로드 함수
-def get_or_create_vector_db(gemini_api_key):
-    if not os.path.exists(VECTOR_DB_PATH):
-        return None
-    with open(VECTOR_DB_PATH, 'rb') as f:
+def get_embeddings_sidecar_path(db_path):
+    """벡터DB 피클 옆에 저장되는 문서 임베딩 파일 경로를 반환합니다."""
+    return os.path.splitext(db_path)[0] + ".embeddings.npy"
+
+def load_vector_db(db_path, gemini_api_key):
+    """SimpleVectorDB 피클을 로드하고 문서 임베딩이 준비된 상태로 반환합니다.
+
+    같은 이름의 메모리 매핑 벡터 저장소(vector_store.py)가 있으면 그것을 우선 사용합니다.
+    문서 임베딩이 없으면 피클 옆의 .embeddings.npy 파일을 사용하고,
+    그것도 없으면 로드 시점에 한 번만 생성해서 저장합니다.
+    임베딩을 준비할 수 없으면 RuntimeError를 발생시킵니다.
+    """
+    from vector_store import get_store_prefix, vector_store_exists, MmapVectorDB
+    prefix = get_store_prefix(db_path)
+    if vector_store_exists(prefix):
+        print(f"✅ 메모리 매핑 벡터 저장소 사용: {prefix}")
+        return MmapVectorDB(prefix, GeminiEmbeddings(gemini_api_key))
+
+    with open(db_path, 'rb') as f:
         vector_db = pickle.load(f)
-    embeddings = GeminiEmbeddings(gemini_api_key)
-    vector_db.embeddings = embeddings
+    vector_db.embeddings = GeminiEmbeddings(gemini_api_key)
+    if getattr(vector_db, '_matrix', None) is not None:
+        return vector_db
+
+    sidecar_path = get_embeddings_sidecar_path(db_path)
+    if os.path.exists(sidecar_path):
+        doc_embeddings = np.load(sidecar_path)
+        if len(doc_embeddings) == len(vector_db.documents):
+            print(f"✅ 저장된 문서 임베딩 사용: {sidecar_path}")
+            vector_db.doc_embeddings = doc_embeddings
+            return vector_db
+        print(f"⚠️ 문서 수와 임베딩 수가 달라 다시 생성합니다: {sidecar_path}")
+
+    print(f"문서 임베딩이 없어 한 번만 생성합니다: {db_path} ({len(vector_db.documents)}개 문서)")
+    try:
+        doc_embeddings = np.asarray(vector_db.embeddings.embed_documents(vector_db.document_texts()), dtype=np.float32)
+        if len(doc_embeddings) != len(vector_db.documents):
+            raise ValueError(f"임베딩 수({len(doc_embeddings)})가 문서 수({len(vector_db.documents)})와 다릅니다.")
+        np.save(sidecar_path, doc_embeddings)
+    except Exception as e:
+        raise RuntimeError(f"벡터DB '{db_path}'의 문서 임베딩을 준비할 수 없어 로드를 중단합니다: {e}") from e
+    print(f"✅ 문서 임베딩 저장 완료: {sidecar_path}")
+    vector_db.doc_embeddings = doc_embeddings
     return vector_db
 
+def vector_db_exists(db_path):
+    """피클 또는 변환된 벡터 저장소 중 하나라도 있는지 확인합니다."""
+    from vector_store import get_store_prefix, vector_store_exists
+    return os.path.exists(db_path) or vector_store_exists(get_store_prefix(db_path))
+
+def get_or_create_vector_db(gemini_api_key):
+    if not vector_db_exists(VECTOR_DB_PATH):
+        return None
+    return load_vector_db(VECTOR_DB_PATH, gemini_api_key)
+
 # 캐시 관리 유틸리티 함수들
 def get_cache_status():
     """현재 캐시 상태를 반환합니다."""
@@ -630,10 +777,10 @@ def clear_cache():
         print("삭제할 캐시가 없습니다.")
 
 # 3. 유사 청크 검색 함수
-def retrieve_relevant_chunks(query, vector_db, k=3):
-    print(f"  - 유사 청크 검색 시작 (k={k})")
+def retrieve_relevant_chunks(query, vector_db, k=3, filters=None):
+    print(f"  - 유사 청크 검색 시작 (k={k}, filters={filters})")
     try:
-        docs = vector_db.similarity_search(query, k=k)
+        docs = vector_db.similarity_search(query, k=k, filters=filters) if filters else vector_db.similarity_search(query, k=k)
         print(f"  - 유사 청크 검색 완료: {len(docs)}개 찾음")
         return docs
     except Exception as e:
@@ -709,7 +856,58 @@ def get_foreign_worker_prompt_template(target_lang):
     return templates.get(target_lang, templates["ko"])
 
 # 4. Gemini 기반 RAG 답변 생성 함수
-def answer_with_rag(query, vector_db, gemini_api_key, model=None, target_lang=None, conversation_context=None):
+def generate_rag_answer(room_type, query, prompt_lang, district, vector_db, gemini_api_key, prompt, on_chunk=None):
+    """답변 캐시를 먼저 확인하고, 없으면 Gemini로 답변을 생성해 캐시에 저장합니다.
+
+    prompt는 문자열이거나, 캐시에 없을 때만 호출되는 프롬프트 생성 함수입니다.
+    on_chunk가 있으면 답변을 스트리밍으로 생성하면서 텍스트 조각을 전달합니다.
+    """
+    cache = get_answer_cache()
+    db_hash = vector_db.content_hash() if hasattr(vector_db, 'content_hash') else None
+    # 같은 질문은 임베딩 없이 먼저 확인하고, 없을 때만 질의를 임베딩해 유사 질문을 찾음
+    query_embedding = None
+    cached_answer = cache.get_exact(room_type, prompt_lang, district, query, db_hash)
+    if cached_answer is None:
+        if getattr(vector_db, 'embeddings', None) is not None:
+            try:
+                query_embedding = vector_db.embeddings.embed_query(query)
+            except Exception as e:
+                print(f"  - 답변 캐시용 질의 임베딩 실패, 유사 질문은 확인하지 않습니다: {e}")
+        cached_answer = cache.get_similar(room_type, prompt_lang, district, query_embedding, db_hash)
+    if cached_answer is not None:
+        print(f"  - 답변 캐시 적중 ({room_type}, {prompt_lang}, {district})")
+        if on_chunk:
+            on_chunk(cached_answer)
+        return cached_answer
+
+    if callable(prompt):
+        prompt = prompt()
+        if prompt is None:
+            return "참고 정보에서 관련 내용을 찾을 수 없습니다."
+    start_time = time.time()
+    answer = generate_text(gemini_api_key, prompt, {"max_output_tokens": 1000, "temperature": 0.1}, on_chunk=on_chunk)
+    cache.put(room_type, prompt_lang, district, query, answer, query_embedding, db_hash, time.time() - start_time)
+    return answer
+
+# 대형폐기물 품목 (질문에 있는 품목의 정보가 문서에 없으면 구청 연락처를 덧붙임)
+LARGE_WASTE_ITEMS = ["책상", "소파", "침대", "장롱", "냉장고", "TV", "세탁기", "에어컨", "자전거", "유모차", "화분", "고양이타워", "피아노", "운동기구", "보일러", "천막"]
+
+def build_waste_context(waste_docs, district, item_query):
+    """구군 쓰레기 처리 문서로 참고 정보를 만듭니다. 질문 속 품목 정보가 없으면 구별 연락처를 추가합니다."""
+    specific_item_found = False
+    for doc in waste_docs:
+        if doc['metadata'].get('type') == 'large_waste_info':
+            content = doc['page_content']
+            if any(item in item_query and item in content for item in LARGE_WASTE_ITEMS):
+                specific_item_found = True
+                break
+    
+    context = "\n\n".join([doc['page_content'] for doc in waste_docs])
+    if not specific_item_found:
+        context += f"\n\n{get_district_contact_info(district)}"
+    return context
+
+def answer_with_rag(query, vector_db, gemini_api_key, model=None, target_lang=None, conversation_context=None, on_chunk=None):
     model = "models/gemini-2.0-flash-lite"
     print(f"  - Gemini RAG 답변 생성 시작")
     print(f"  - 전달받은 target_lang: {target_lang}")
@@ -742,49 +940,21 @@ def answer_with_rag(query, vector_db, gemini_api_key, model=None, target_lang=No
             print(f"  - 조합된 질문: {combined_query}")
             
             # 쓰레기 처리 관련 문서들을 직접 찾기
-            waste_docs = []
-            for doc in vector_db.documents:
-                if isinstance(doc, dict) and 'metadata' in doc:
-                    metadata = doc['metadata']
-                    if 'category' in metadata and metadata['category'] == '쓰레기처리':
-                        if 'gu_name' in metadata and metadata['gu_name'] == district:
-                            waste_docs.append(doc)
+            waste_docs = vector_db.find_documents(category='쓰레기처리', gu_name=district)
             
             if waste_docs:
                 print(f"  - {district} 관련 쓰레기 처리 문서 {len(waste_docs)}개 찾음")
                 
-                # 특정 품목 정보 확인
-                specific_item_found = False
-                for doc in waste_docs:
-                    if doc['metadata'].get('type') == 'large_waste_info':
-                        content = doc['page_content']
-                        # 이전 질문에서 특정 품목 추출
-                        specific_items = ["책상", "소파", "침대", "장롱", "냉장고", "TV", "세탁기", "에어컨", "자전거", "유모차", "화분", "고양이타워", "피아노", "운동기구", "보일러", "천막"]
-                        for item in specific_items:
-                            if item in previous_waste_query and item in content:
-                                specific_item_found = True
-                                break
-                        if specific_item_found:
-                            break
-                
-                context = "\n\n".join([doc['page_content'] for doc in waste_docs])
-                
-                # 특정 품목 정보가 부족한 경우 추가 안내 포함
-                if not specific_item_found:
-                    # 구별 연락처 정보 추가
-                    district_contact_info = get_district_contact_info(district)
-                    context += f"\n\n{district_contact_info}"
+                # 프롬프트는 답변 캐시에 없을 때만 만듭니다
+                def build_district_prompt():
+                    context = build_waste_context(waste_docs, district, previous_waste_query)
+                    return get_multicultural_prompt_template(prompt_lang).format(context=context, query=combined_query)
                 
-                multicultural_prompt_template = get_multicultural_prompt_template(prompt_lang)
-                prompt = multicultural_prompt_template.format(context=context, query=combined_query)
-                
-                genai.configure(api_key=gemini_api_key)
-                model = genai.GenerativeModel("gemini-2.0-flash-lite")
-                response = model.generate_content(prompt, generation_config={"max_output_tokens": 1000, "temperature": 0.1})
-                answer = response.text.strip()
-                return answer
+                return generate_rag_answer("multicultural", combined_query, prompt_lang, district, vector_db, gemini_api_key, build_district_prompt, on_chunk)
     
     # 쓰레기 처리 관련 질문인지 확인
+    district = None
+    build_prompt = None
     if is_waste_related_query(query):
         print(f"  - 쓰레기 처리 관련 질문 감지됨")
         
@@ -807,47 +977,21 @@ def answer_with_rag(query, vector_db, gemini_api_key, model=None, target_lang=No
                 conversation_context['waste_district'] = district
             
             # 쓰레기 처리 관련 문서들을 직접 찾기
-            waste_docs = []
-            for doc in vector_db.documents:
-                if isinstance(doc, dict) and 'metadata' in doc:
-                    metadata = doc['metadata']
-                    if 'category' in metadata and metadata['category'] == '쓰레기처리':
-                        if 'gu_name' in metadata and metadata['gu_name'] == district:
-                            waste_docs.append(doc)
+            waste_docs = vector_db.find_documents(category='쓰레기처리', gu_name=district)
             
             if waste_docs:
                 print(f"  - {district} 관련 쓰레기 처리 문서 {len(waste_docs)}개 찾음")
                 
-                # 특정 품목 정보 확인
-                specific_item_found = False
-                for doc in waste_docs:
-                    if doc['metadata'].get('type') == 'large_waste_info':
-                        content = doc['page_content']
-                        # 질문에서 특정 품목 추출
-                        specific_items = ["책상", "소파", "침대", "장롱", "냉장고", "TV", "세탁기", "에어컨", "자전거", "유모차", "화분", "고양이타워", "피아노", "운동기구", "보일러", "천막"]
-                        for item in specific_items:
-                            if item in query and item in content:
-                                specific_item_found = True
-                                break
-                        if specific_item_found:
-                            break
-                
-                context = "\n\n".join([doc['page_content'] for doc in waste_docs])
-                
-                # 특정 품목 정보가 부족한 경우 추가 안내 포함
-                if not specific_item_found:
-                    # 구별 연락처 정보 추가
-                    district_contact_info = get_district_contact_info(district)
-                    context += f"\n\n{district_contact_info}"
-                
-                multicultural_prompt_template = get_multicultural_prompt_template(prompt_lang)
-                prompt = multicultural_prompt_template.format(context=context, query=query)
+                def build_prompt():
+                    context = build_waste_context(waste_docs, district, query)
+                    return get_multicultural_prompt_template(prompt_lang).format(context=context, query=query)
             else:
-                print(f"  - {district} 관련 쓰레기 처리 문서를 찾을 수 없음, 전체 문서 사용")
-                relevant_chunks = retrieve_relevant_chunks(query, vector_db)
-                context = "\n\n".join([doc['page_content'] if isinstance(doc, dict) and 'page_content' in doc else str(doc) for doc in relevant_chunks])
-                multicultural_prompt_template = get_multicultural_prompt_template(prompt_lang)
-                prompt = multicultural_prompt_template.format(context=context, query=query)
+                print(f"  - {district} 관련 쓰레기 처리 문서를 찾을 수 없음, 쓰레기처리 문서 안에서 검색")
+                
+                def build_prompt():
+                    relevant_chunks = retrieve_relevant_chunks(query, vector_db, filters={'category': '쓰레기처리'}) or retrieve_relevant_chunks(query, vector_db)
+                    context = "\n\n".join([doc['page_content'] if isinstance(doc, dict) and 'page_content' in doc else str(doc) for doc in relevant_chunks])
+                    return get_multicultural_prompt_template(prompt_lang).format(context=context, query=query)
         else:
             print(f"  - 구군명이 감지되지 않음, 구군 선택 요청")
             return get_district_selection_prompt(prompt_lang)
@@ -855,18 +999,15 @@ def answer_with_rag(query, vector_db, gemini_api_key, model=None, target_lang=No
         # 일반 질문 처리 (쓰레기 처리 관련이 아닌 경우)
         print(f"  - 일반 질문 처리 (쓰레기 처리 관련 아님)")
     
-    relevant_chunks = retrieve_relevant_chunks(query, vector_db)
-    if not relevant_chunks:
-        return "참고 정보에서 관련 내용을 찾을 수 없습니다."
-    context = "\n\n".join([doc['page_content'] if isinstance(doc, dict) and 'page_content' in doc else str(doc) for doc in relevant_chunks])
-    multicultural_prompt_template = get_multicultural_prompt_template(prompt_lang)
-    prompt = multicultural_prompt_template.format(context=context, query=query)
+    if build_prompt is None:
+        def build_prompt():
+            relevant_chunks = retrieve_relevant_chunks(query, vector_db)
+            if not relevant_chunks:
+                return None
+            context = "\n\n".join([doc['page_content'] if isinstance(doc, dict) and 'page_content' in doc else str(doc) for doc in relevant_chunks])
+            return get_multicultural_prompt_template(prompt_lang).format(context=context, query=query)
     
-    genai.configure(api_key=gemini_api_key)
-    model = genai.GenerativeModel("gemini-2.0-flash-lite")
-    response = model.generate_content(prompt, generation_config={"max_output_tokens": 1000, "temperature": 0.1})
-    answer = response.text.strip()
-    return answer
+    return generate_rag_answer("multicultural", query, prompt_lang, district, vector_db, gemini_api_key, build_prompt, on_chunk)
 
 def get_district_contact_info(district):
     """구별 연락처 정보를 반환합니다."""
@@ -951,7 +1092,7 @@ def get_district_contact_info(district):
 해당 구청 홈페이지에서 확인하시기 바랍니다.
 """)
 
-def answer_with_rag_foreign_worker(query, vector_db, gemini_api_key, model=None, target_lang=None, conversation_context=None):
+def answer_with_rag_foreign_worker(query, vector_db, gemini_api_key, model=None, target_lang=None, conversation_context=None, on_chunk=None):
     model = "models/gemini-2.0-flash-lite"
     print(f"  - Gemini 외국인 근로자 RAG 답변 생성 시작")
     print(f"  - 전달받은 target_lang: {target_lang}")
@@ -984,49 +1125,21 @@ def answer_with_rag_foreign_worker(query, vector_db, gemini_api_key, model=None,
             print(f"  - 조합된 질문: {combined_query}")
             
             # 쓰레기 처리 관련 문서들을 직접 찾기
-            waste_docs = []
-            for doc in vector_db.documents:
-                if isinstance(doc, dict) and 'metadata' in doc:
-                    metadata = doc['metadata']
-                    if 'category' in metadata and metadata['category'] == '쓰레기처리':
-                        if 'gu_name' in metadata and metadata['gu_name'] == district:
-                            waste_docs.append(doc)
+            waste_docs = vector_db.find_documents(category='쓰레기처리', gu_name=district)
             
             if waste_docs:
                 print(f"  - {district} 관련 쓰레기 처리 문서 {len(waste_docs)}개 찾음")
                 
-                # 특정 품목 정보 확인
-                specific_item_found = False
-                for doc in waste_docs:
-                    if doc['metadata'].get('type') == 'large_waste_info':
-                        content = doc['page_content']
-                        # 이전 질문에서 특정 품목 추출
-                        specific_items = ["책상", "소파", "침대", "장롱", "냉장고", "TV", "세탁기", "에어컨", "자전거", "유모차", "화분", "고양이타워", "피아노", "운동기구", "보일러", "천막"]
-                        for item in specific_items:
-                            if item in previous_waste_query and item in content:
-                                specific_item_found = True
-                                break
-                        if specific_item_found:
-                            break
-                
-                context = "\n\n".join([doc['page_content'] for doc in waste_docs])
+                # 프롬프트는 답변 캐시에 없을 때만 만듭니다
+                def build_district_prompt():
+                    context = build_waste_context(waste_docs, district, previous_waste_query)
+                    return get_foreign_worker_prompt_template(prompt_lang).format(context=context, query=combined_query)
                 
-                # 특정 품목 정보가 부족한 경우 추가 안내 포함
-                if not specific_item_found:
-                    # 구별 연락처 정보 추가
-                    district_contact_info = get_district_contact_info(district)
-                    context += f"\n\n{district_contact_info}"
-                
-                foreign_worker_prompt_template = get_foreign_worker_prompt_template(prompt_lang)
-                prompt = foreign_worker_prompt_template.format(context=context, query=combined_query)
-                
-                genai.configure(api_key=gemini_api_key)
-                model = genai.GenerativeModel("gemini-2.0-flash-lite")
-                response = model.generate_content(prompt, generation_config={"max_output_tokens": 1000, "temperature": 0.1})
-                answer = response.text.strip()
-                return answer
+                return generate_rag_answer("foreign_worker", combined_query, prompt_lang, district, vector_db, gemini_api_key, build_district_prompt, on_chunk)
     
     # 쓰레기 처리 관련 질문인지 확인
+    district = None
+    build_prompt = None
     if is_waste_related_query(query):
         print(f"  - 쓰레기 처리 관련 질문 감지됨")
         
@@ -1049,47 +1162,21 @@ def answer_with_rag_foreign_worker(query, vector_db, gemini_api_key, model=None,
                 conversation_context['waste_district'] = district
             
             # 쓰레기 처리 관련 문서들을 직접 찾기
-            waste_docs = []
-            for doc in vector_db.documents:
-                if isinstance(doc, dict) and 'metadata' in doc:
-                    metadata = doc['metadata']
-                    if 'category' in metadata and metadata['category'] == '쓰레기처리':
-                        if 'gu_name' in metadata and metadata['gu_name'] == district:
-                            waste_docs.append(doc)
+            waste_docs = vector_db.find_documents(category='쓰레기처리', gu_name=district)
             
             if waste_docs:
                 print(f"  - {district} 관련 쓰레기 처리 문서 {len(waste_docs)}개 찾음")
                 
-                # 특정 품목 정보 확인
-                specific_item_found = False
-                for doc in waste_docs:
-                    if doc['metadata'].get('type') == 'large_waste_info':
-                        content = doc['page_content']
-                        # 질문에서 특정 품목 추출
-                        specific_items = ["책상", "소파", "침대", "장롱", "냉장고", "TV", "세탁기", "에어컨", "자전거", "유모차", "화분", "고양이타워", "피아노", "운동기구", "보일러", "천막"]
-                        for item in specific_items:
-                            if item in query and item in content:
-                                specific_item_found = True
-                                break
-                        if specific_item_found:
-                            break
-                
-                context = "\n\n".join([doc['page_content'] for doc in waste_docs])
-                
-                # 특정 품목 정보가 부족한 경우 추가 안내 포함
-                if not specific_item_found:
-                    # 구별 연락처 정보 추가
-                    district_contact_info = get_district_contact_info(district)
-                    context += f"\n\n{district_contact_info}"
-                
-                foreign_worker_prompt_template = get_foreign_worker_prompt_template(prompt_lang)
-                prompt = foreign_worker_prompt_template.format(context=context, query=query)
+                def build_prompt():
+                    context = build_waste_context(waste_docs, district, query)
+                    return get_foreign_worker_prompt_template(prompt_lang).format(context=context, query=query)
             else:
-                print(f"  - {district} 관련 쓰레기 처리 문서를 찾을 수 없음, 전체 문서 사용")
-                relevant_chunks = retrieve_relevant_chunks(query, vector_db)
-                context = "\n\n".join([doc['page_content'] if isinstance(doc, dict) and 'page_content' in doc else str(doc) for doc in relevant_chunks])
-                foreign_worker_prompt_template = get_foreign_worker_prompt_template(prompt_lang)
-                prompt = foreign_worker_prompt_template.format(context=context, query=query)
+                print(f"  - {district} 관련 쓰레기 처리 문서를 찾을 수 없음, 쓰레기처리 문서 안에서 검색")
+                
+                def build_prompt():
+                    relevant_chunks = retrieve_relevant_chunks(query, vector_db, filters={'category': '쓰레기처리'}) or retrieve_relevant_chunks(query, vector_db)
+                    context = "\n\n".join([doc['page_content'] if isinstance(doc, dict) and 'page_content' in doc else str(doc) for doc in relevant_chunks])
+                    return get_foreign_worker_prompt_template(prompt_lang).format(context=context, query=query)
         else:
             print(f"  - 구군명이 감지되지 않음, 구군 선택 요청")
             return get_district_selection_prompt(prompt_lang)
@@ -1097,18 +1184,15 @@ def answer_with_rag_foreign_worker(query, vector_db, gemini_api_key, model=None,
         # 일반 질문 처리 (쓰레기 처리 관련이 아닌 경우)
         print(f"  - 일반 질문 처리 (쓰레기 처리 관련 아님)")
     
-    relevant_chunks = retrieve_relevant_chunks(query, vector_db)
-    if not relevant_chunks:
-        return "참고 정보에서 관련 내용을 찾을 수 없습니다."
-    context = "\n\n".join([doc['page_content'] if isinstance(doc, dict) and 'page_content' in doc else str(doc) for doc in relevant_chunks])
-    foreign_worker_prompt_template = get_foreign_worker_prompt_template(prompt_lang)
-    prompt = foreign_worker_prompt_template.format(context=context, query=query)
+    if build_prompt is None:
+        def build_prompt():
+            relevant_chunks = retrieve_relevant_chunks(query, vector_db)
+            if not relevant_chunks:
+                return None
+            context = "\n\n".join([doc['page_content'] if isinstance(doc, dict) and 'page_content' in doc else str(doc) for doc in relevant_chunks])
+            return get_foreign_worker_prompt_template(prompt_lang).format(context=context, query=query)
     
-    genai.configure(api_key=gemini_api_key)
-    model = genai.GenerativeModel("gemini-2.0-flash-lite")
-    response = model.generate_content(prompt, generation_config={"max_output_tokens": 1000, "temperature": 0.1})
-    answer = response.text.strip()
-    return answer
+    return generate_rag_answer("foreign_worker", query, prompt_lang, district, vector_db, gemini_api_key, build_prompt, on_chunk)
 
 def get_or_create_vector_db_multi(pdf_paths, gemini_api_key):
     """여러 PDF를 한 번에 임베딩해서 하나의 벡터DB로 저장합니다."""
@@ -2,8 +2,11 @@ import json
 import pickle
 import numpy as np
 from rag_utils import GeminiEmbeddings
+from llm_client import generate_text
+from vector_store import get_store_prefix, vector_store_exists, load_restaurant_store
 from typing import List, Dict, Any, Tuple
 import re
+import threading
 from datetime import datetime
 
 class HybridRestaurantSearch:
@@ -36,9 +39,13 @@ class HybridRestaurantSearch:
         
         # 2. 벡터DB 로드 (부산의맛.pkl이 있다면)
         try:
-            with open('부산의맛.pkl', 'rb') as f:
-                self.vector_db = pickle.load(f)
-            print("벡터DB 로드 완료")
+            if vector_store_exists(get_store_prefix('부산의맛.pkl')):
+                self.vector_db = load_restaurant_store(get_store_prefix('부산의맛.pkl'))
+                print("벡터DB 로드 완료 (메모리 매핑)")
+            else:
+                with open('부산의맛.pkl', 'rb') as f:
+                    self.vector_db = pickle.load(f)
+                print("벡터DB 로드 완료")
             
         except FileNotFoundError:
             print("벡터DB 파일이 없습니다. JSON 검색만 사용합니다.")
@@ -401,8 +408,8 @@ class HybridRestaurantSearch:
             return []
         
         try:
-            # 쿼리 임베딩
-            query_embedding = self.embeddings.embed_query(query)
+            # 쿼리 임베딩 (공유 질의 임베딩 캐시 사용)
+            query_embedding = np.asarray(self.embeddings.embed_query(query))
             
             # 유사도 계산
             similarities = np.dot(self.vector_db['embeddings'], query_embedding.T).flatten()
@@ -432,7 +439,7 @@ class HybridRestaurantSearch:
             return self.search_by_keywords(query)
         
         try:
-            # 쿼리 임베딩
+            # 쿼리 임베딩 (공유 질의 임베딩 캐시 사용)
             query_embedding = self.embeddings.embed_query(query)
             
             # 임베딩 형식 확인 및 변환
@@ -518,18 +525,13 @@ class HybridRestaurantSearch:
         
         return restaurant_info if restaurant_info['name'] else None
     
-    def hybrid_search(self, query: str) -> Dict[str, Any]:
-        """RAG 기반 검색으로 변경"""
+    def hybrid_search(self, query: str, on_chunk=None) -> Dict[str, Any]:
+        """RAG 기반 검색으로 변경 (on_chunk가 있으면 Gemini 답변을 스트리밍으로 전달)"""
         print(f"검색 쿼리: {query}")
         
         # 지역명 분석 및 구 정보 추가
         enhanced_query = query
         try:
-            import google.generativeai as genai
-            
-            genai.configure(api_key=self.gemini_api_key)
-            model = genai.GenerativeModel("gemini-2.0-flash-lite")
-            
             # 지역명 분석 프롬프트
             location_prompt = f"""
 다음 검색어에서 부산의 지역명이나 주요 건물이 언급되었는지 확인하고, 해당 지역이 어느 구에 속하는지 알려주세요.
@@ -577,8 +579,7 @@ class HybridRestaurantSearch:
 - "피자 맛집" → "없음"
 """
             
-            location_response = model.generate_content(location_prompt, generation_config={"max_output_tokens": 128, "temperature": 0.1})
-            location_result = location_response.text.strip()
+            location_result = generate_text(self.gemini_api_key, location_prompt, {"max_output_tokens": 128, "temperature": 0.1})
             
             # 지역명이 발견되면 구 정보를 검색어에 추가
             if ":" in location_result and location_result != "없음":
@@ -600,14 +601,8 @@ class HybridRestaurantSearch:
             # 간단한 외국어 감지 (한글이 포함되지 않은 경우)
             if not any('\u3131' <= char <= '\u3163' or '\uac00' <= char <= '\ud7af' for char in enhanced_query):
                 # Gemini API를 사용하여 한국어로 번역
-                import google.generativeai as genai
-                
-                genai.configure(api_key=self.gemini_api_key)
-                model = genai.GenerativeModel("gemini-2.0-flash-lite")
-                
                 prompt = f"Translate the following text to Korean and return only the translation. This is for restaurant search in Busan, so translate food-related terms appropriately.\nText: {enhanced_query}"
-                response = model.generate_content(prompt, generation_config={"max_output_tokens": 256, "temperature": 0.1})
-                translated_query = response.text.strip()
+                translated_query = generate_text(self.gemini_api_key, prompt, {"max_output_tokens": 256, "temperature": 0.1})
                 print(f"외국어 검색어 번역: '{enhanced_query}' -> '{translated_query}'")
         except Exception as e:
             print(f"검색어 번역 오류: {e}")
@@ -622,7 +617,7 @@ class HybridRestaurantSearch:
         combined_results = self.combine_results(rag_results)
         
         # 답변 생성
-        answer = self.generate_answer(query, combined_results)
+        answer = self.generate_answer(query, combined_results, on_chunk=on_chunk)
         
         return {
             'query': query,
@@ -647,15 +642,11 @@ class HybridRestaurantSearch:
         
         return unique_results[:10]  # 상위 10개
 
-    def generate_answer(self, query: str, results: List[Dict]) -> str:
+    def generate_answer(self, query: str, results: List[Dict], on_chunk=None) -> str:
         """검색 결과를 바탕으로 답변 생성"""
         if not results:
             # DB에 없는 경우 Gemini 검색을 통해 답변 생성
             try:
-                import google.generativeai as genai
-                genai.configure(api_key=self.gemini_api_key)
-                model = genai.GenerativeModel("gemini-2.0-flash-lite")
-                
                 prompt = f"""부산 맛집에 대한 질문에 대해 100자 이내로 간단하고 친근하게 답변해주세요.
 
 질문: {query}
@@ -671,8 +662,7 @@ class HybridRestaurantSearch:
 - "부산 {query} 맛집은 광안리나 남포동에 많이 있어요. 특히 해운대구의 해산물 맛집들이 유명합니다."
 """
                     
-                response = model.generate_content(prompt, generation_config={"max_output_tokens": 200, "temperature": 0.7})
-                return response.text.strip()
+                return generate_text(self.gemini_api_key, prompt, {"max_output_tokens": 200, "temperature": 0.7}, on_chunk=on_chunk)
             except Exception as e:
                 print(f"Gemini 검색 오류: {e}")
                 # API 오류 시 기본 답변 제공
@@ -772,18 +762,22 @@ class HybridRestaurantSearch:
 
 # 전역 인스턴스
 restaurant_search = None
+_restaurant_search_lock = threading.Lock()
 
 def get_restaurant_search(gemini_api_key):
     """맛집 검색 시스템 인스턴스 반환"""
     global restaurant_search
     if restaurant_search is None:
-        restaurant_search = HybridRestaurantSearch(gemini_api_key)
+        # 백그라운드 로딩과 첫 질문이 동시에 들어와도 한 번만 생성
+        with _restaurant_search_lock:
+            if restaurant_search is None:
+                restaurant_search = HybridRestaurantSearch(gemini_api_key)
     return restaurant_search
 
-def search_restaurants(query: str, gemini_api_key: str) -> str:
+def search_restaurants(query: str, gemini_api_key: str, on_chunk=None) -> str:
     """맛집 검색 함수 (RAG 시스템에서 사용)"""
     search_system = get_restaurant_search(gemini_api_key)
     
     # RAG 검색만 사용
-    result = search_system.hybrid_search(query)
+    result = search_system.hybrid_search(query, on_chunk=on_chunk)
     return result['answer'] 
\ No newline at end of file
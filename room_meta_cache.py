@@ -0,0 +1,202 @@
+"""
+채팅방 메타데이터 캐시
+방 제목/언어/고정 여부/생성자 같은 메타데이터를 /room_meta/{room_id}에 따로 저장하고,
+조회 결과를 TTL이 있는 메모리 캐시에 보관합니다.
+/rooms/{room_id}를 통째로 get()하면 messages 하위 트리까지 내려받게 되므로,
+메타데이터가 아직 없는 기존 방은 shallow 조회로 필드만 읽어 /room_meta에 채워 둡니다.
+/room_meta 리스너가 켜져 있으면 다른 프로세스의 변경도 바로 반영됩니다.
+리스너는 /rooms의 삭제나 /room_meta에 없는 기존 방은 알려 주지 않으므로 TTL은 항상 상한으로 적용합니다.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from firebase_admin import db
+
+ROOM_META_TTL = int(os.getenv("ROOM_META_TTL", "300"))  # 초
+ROOM_META_BACKFILL_WORKERS = int(os.getenv("ROOM_META_BACKFILL_WORKERS", "8"))
+
+# /room_meta에 저장하는 방 필드 (messages, blocked_users 등 하위 트리는 제외)
+ROOM_META_FIELDS = ('id', 'title', 'user_lang', 'target_lang', 'created_at',
+                    'is_persistent', 'created_by', 'creator_id', 'is_rag')
+
+
+def extract_room_meta(room_data):
+    """방 데이터에서 메타데이터 필드만 골라냅니다."""
+    return {k: room_data[k] for k in ROOM_META_FIELDS if k in room_data and not isinstance(room_data[k], dict)}
+
+
+class RoomMetaCache:
+    def __init__(self, ttl=ROOM_META_TTL):
+        self.ttl = ttl
+        self._entries = {}  # room_id -> (메타데이터 또는 None, 저장 시각)
+        self._lock = threading.Lock()
+        self._listener = None
+        self._all_loaded_at = 0
+        self.hits = 0
+        self.misses = 0
+
+    def start_listening(self):
+        """/room_meta 변경을 구독해 캐시를 갱신합니다. 한 번만 시작됩니다."""
+        with self._lock:
+            if self._listener is not None:
+                return
+            self._listener = False  # 자리 표시
+        try:
+            listener = db.reference('/room_meta').listen(self._on_event)
+            with self._lock:
+                self._listener = listener
+        except Exception as e:
+            print(f"⚠️ 방 메타데이터 리스너 설정 실패, TTL로만 갱신합니다: {e}")
+            with self._lock:
+                self._listener = None
+
+    def _on_event(self, event):
+        path_parts = [p for p in (event.path or '').split('/') if p]
+        now = time.time()
+        with self._lock:
+            if not path_parts:
+                if isinstance(event.data, dict):
+                    for room_id, meta in event.data.items():
+                        self._entries[room_id] = (meta if isinstance(meta, dict) else None, now)
+                return
+            room_id = path_parts[0]
+            if len(path_parts) == 1 and event.event_type == 'put':
+                self._entries[room_id] = (event.data if isinstance(event.data, dict) else None, now)
+                return
+            # 필드 단위 변경은 기존 항목에 합침
+            meta = dict((self._entries.get(room_id) or ({}, now))[0] or {})
+            if len(path_parts) == 1 and isinstance(event.data, dict):
+                meta.update(event.data)
+            elif len(path_parts) == 2:
+                if event.data is None:
+                    meta.pop(path_parts[1], None)
+                else:
+                    meta[path_parts[1]] = event.data
+            self._entries[room_id] = (meta or None, now)
+
+    def _is_fresh(self, stored_at, now):
+        # 리스너가 갱신한 항목도 TTL을 넘기면 다시 읽음 (/rooms에서 삭제된 방 등)
+        return now - stored_at <= self.ttl
+
+    def get(self, room_id):
+        """방 메타데이터를 반환합니다. 방이 없으면 None."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(room_id)
+            if entry is not None and self._is_fresh(entry[1], now):
+                self.hits += 1
+                return dict(entry[0]) if entry[0] else None
+            self.misses += 1
+        meta = self._fetch(room_id)
+        with self._lock:
+            self._entries[room_id] = (meta, time.time())
+        return dict(meta) if meta else None
+
+    def _fetch(self, room_id):
+        meta = db.reference(f'/room_meta/{room_id}').get()
+        if isinstance(meta, dict):
+            return meta
+        return self._backfill(room_id)
+
+    def _backfill(self, room_id):
+        """메타데이터가 없는 기존 방: messages는 내려받지 않도록 shallow 조회 후 /room_meta에 채워 둡니다."""
+        room_data = db.reference(f'/rooms/{room_id}').get(shallow=True)
+        if not isinstance(room_data, dict):
+            return None
+        meta = extract_room_meta(room_data)
+        if not meta:
+            return None
+        try:
+            db.reference(f'/room_meta/{room_id}').set(meta)
+        except Exception as e:
+            print(f"⚠️ 방 메타데이터 저장 실패 ({room_id}): {e}")
+        return meta
+
+    def list_rooms(self):
+        """모든 방의 {room_id: 메타데이터}를 반환합니다.
+        /room_meta에 아직 없는 기존 방은 여러 스레드로 나눠 채운 뒤 함께 반환합니다. (한 번 채우면 다음부터는 /room_meta에 있음)"""
+        now = time.time()
+        with self._lock:
+            if self._all_loaded_at and self._is_fresh(self._all_loaded_at, now):
+                self.hits += 1
+                return {k: dict(v[0]) for k, v in self._entries.items() if v[0]}
+            self.misses += 1
+        metas = db.reference('/room_meta').get() or {}
+        room_ids = db.reference('/rooms').get(shallow=True) or {}
+        # /rooms에서 삭제된 방은 /room_meta에 남아 있어도 제외
+        metas = {room_id: meta for room_id, meta in metas.items() if room_id in room_ids and isinstance(meta, dict)}
+        missing = [room_id for room_id in room_ids if room_id not in metas]
+        if missing:
+            metas.update(self._backfill_many(missing))
+        now = time.time()
+        with self._lock:
+            for room_id in [k for k in self._entries if k not in room_ids]:
+                del self._entries[room_id]
+            for room_id, meta in metas.items():
+                self._entries[room_id] = (meta, now)
+            self._all_loaded_at = now
+        return {k: dict(v) for k, v in metas.items()}
+
+    def _backfill_many(self, room_ids):
+        """메타데이터가 없는 기존 방들을 최대 ROOM_META_BACKFILL_WORKERS개씩 동시에 채우고 {room_id: 메타데이터}를 반환합니다."""
+        print(f"방 메타데이터가 없는 기존 방 {len(room_ids)}개를 채웁니다")
+
+        def backfill_one(room_id):
+            try:
+                return room_id, self._backfill(room_id)
+            except Exception as e:
+                print(f"⚠️ 방 메타데이터 채우기 실패 ({room_id}): {e}")
+                return room_id, None
+
+        workers = max(1, min(ROOM_META_BACKFILL_WORKERS, len(room_ids)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="room-meta") as executor:
+            return {room_id: meta for room_id, meta in executor.map(backfill_one, room_ids) if meta}
+
+    def put(self, room_id, room_data):
+        """방을 만들거나 바꿀 때 메타데이터를 /room_meta에 저장하고 캐시에 반영합니다."""
+        meta = extract_room_meta(room_data)
+        db.reference(f'/room_meta/{room_id}').set(meta)
+        with self._lock:
+            self._entries[room_id] = (meta, time.time())
+
+    def invalidate(self, room_id=None):
+        with self._lock:
+            if room_id is None:
+                self._entries.clear()
+                self._all_loaded_at = 0
+            else:
+                self._entries.pop(room_id, None)
+
+    def get_stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "listening": bool(self._listener),
+            }
+
+
+# 프로세스 전체에서 공유하는 방 메타데이터 캐시
+_room_meta_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_room_meta_cache():
+    global _room_meta_cache
+    if _room_meta_cache is None:
+        with _cache_lock:
+            if _room_meta_cache is None:
+                _room_meta_cache = RoomMetaCache()
+                _room_meta_cache.start_listening()
+    return _room_meta_cache
+
+
+def get_room_meta(room_id):
+    """방 메타데이터를 캐시에서 조회합니다. 방이 없으면 None."""
+    return get_room_meta_cache().get(room_id)
@@ -0,0 +1,235 @@
+"""
+채팅방 구독 허브
+같은 서버에서 같은 방을 보고 있는 세션이 여러 개여도 rooms/{room_id}/messages 리스너는 방마다 하나만 엽니다.
+리스너 이벤트는 구독 중인 모든 세션의 콜백으로 나눠 보내고,
+최근 메시지를 작은 버퍼에 보관해 나중에 들어온 세션에는 그 상태를 스냅샷 이벤트로 먼저 보내 줍니다.
+마지막 세션이 구독을 해제하면 리스너를 닫습니다.
+
+참고: firebase_admin의 listen()은 Reference에만 있고 쿼리(limit_to_last 등)에는 없으므로,
+방의 첫 리스너는 messages 하위 트리 전체를 첫 스냅샷으로 내려받습니다.
+화면에는 최근 메시지 창만 그리지만, 이 첫 다운로드 크기는 방의 메시지 수에 비례합니다.
+"""
+
+import itertools
+import os
+import threading
+from collections import OrderedDict, namedtuple
+
+from firebase_admin import db
+
+ROOM_EVENT_BUFFER = int(os.getenv("ROOM_EVENT_BUFFER", "200"))
+
+# Firebase 리스너 이벤트와 같은 속성을 가진 이벤트 (스냅샷 재전송용)
+HubEvent = namedtuple("HubEvent", ["event_type", "path", "data"])
+
+
+class RoomSubscription:
+    """subscribe()가 반환하는 구독 핸들. close()로 구독을 해제합니다."""
+
+    def __init__(self, hub, room_id, subscription_id):
+        self.hub = hub
+        self.room_id = room_id
+        self.subscription_id = subscription_id
+        self.closed = False
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.hub.unsubscribe(self.room_id, self.subscription_id)
+
+
+class _Subscriber:
+    def __init__(self, callback, pending=None):
+        self.callback = callback
+        # 스냅샷을 받기 전에 도착한 실시간 이벤트 (스냅샷 전달이 끝나면 None)
+        self.pending = pending
+
+
+class _RoomChannel:
+    def __init__(self, room_id, buffer_size):
+        self.room_id = room_id
+        self.buffer_size = buffer_size
+        self.subscribers = {}          # 구독 id -> _Subscriber
+        self.recent = OrderedDict()    # 메시지 키 -> 메시지 (키 순서 = 시간순)
+        self.ready = False             # 리스너의 첫 스냅샷을 받았는지
+        self.listener = None
+        self.lock = threading.Lock()
+
+    def apply(self, event):
+        """이벤트를 최근 메시지 버퍼에 반영합니다."""
+        path_parts = [p for p in (event.path or '').split('/') if p]
+        data = event.data
+        if not path_parts:
+            if event.event_type == 'put':
+                self.recent.clear()
+                self.ready = True
+                if isinstance(data, dict):
+                    for key in sorted(data)[-self.buffer_size:]:
+                        self.recent[key] = data[key]
+            elif isinstance(data, dict):
+                for key, value in data.items():
+                    self._set(key, value)
+            return
+        key = path_parts[0]
+        if len(path_parts) == 1:
+            if event.event_type == 'patch' and isinstance(data, dict) and isinstance(self.recent.get(key), dict):
+                self.recent[key] = dict(self.recent[key], **data)
+            else:
+                self._set(key, data)
+        elif isinstance(self.recent.get(key), dict):
+            message = dict(self.recent[key])
+            if data is None:
+                message.pop(path_parts[1], None)
+            else:
+                message[path_parts[1]] = data
+            self.recent[key] = message
+
+    def _set(self, key, value):
+        if value is None:
+            self.recent.pop(key, None)
+            return
+        self.recent[key] = value
+        while len(self.recent) > self.buffer_size:
+            self.recent.popitem(last=False)
+
+
+class RoomSubscriptionHub:
+    def __init__(self, buffer_size=ROOM_EVENT_BUFFER):
+        self.buffer_size = buffer_size
+        self._channels = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.listeners_opened = 0
+        self.listeners_closed = 0
+        self.events_received = 0
+        self.events_dispatched = 0
+
+    def subscribe(self, room_id, callback):
+        """방 메시지 이벤트를 구독합니다. 반환된 핸들의 close()로 해제합니다."""
+        subscription_id = next(self._ids)
+        with self._lock:
+            channel = self._channels.get(room_id)
+            is_new = channel is None
+            if is_new:
+                channel = _RoomChannel(room_id, self.buffer_size)
+                self._channels[room_id] = channel
+            with channel.lock:
+                # 이미 스냅샷을 받은 방이면 최근 메시지를 새 세션에 먼저 보냄.
+                # 스냅샷을 보내기 전에 도착한 실시간 이벤트는 pending에 모았다가 스냅샷 뒤에 보냄
+                snapshot = HubEvent('put', '/', dict(channel.recent)) if channel.ready else None
+                subscriber = _Subscriber(callback, [] if snapshot is not None else None)
+                channel.subscribers[subscription_id] = subscriber
+
+        if is_new:
+            try:
+                listener = db.reference(f'rooms/{room_id}/messages').listen(
+                    lambda event: self._dispatch(channel, event)
+                )
+                with self._lock:
+                    self.listeners_opened += 1
+                    # 리스너를 여는 동안 모든 구독이 해제되었으면 바로 닫음
+                    orphaned = self._channels.get(room_id) is not channel
+                    if not orphaned:
+                        channel.listener = listener
+                if orphaned:
+                    listener.close()
+                    with self._lock:
+                        self.listeners_closed += 1
+                    return RoomSubscription(self, room_id, subscription_id)
+                print(f"✅ 방 리스너 시작: {room_id}")
+            except Exception as e:
+                with self._lock:
+                    self._channels.pop(room_id, None)
+                raise e
+        elif snapshot is not None:
+            if snapshot.data:
+                self._call(callback, snapshot)
+            self._flush_pending(channel, subscriber)
+        return RoomSubscription(self, room_id, subscription_id)
+
+    def _flush_pending(self, channel, subscriber):
+        """스냅샷 뒤에 그동안 모인 실시간 이벤트를 순서대로 보내고, 이후에는 바로 받도록 전환합니다."""
+        while True:
+            with channel.lock:
+                events = subscriber.pending
+                if not events:
+                    subscriber.pending = None
+                    return
+                subscriber.pending = []
+            for event in events:
+                self._call(subscriber.callback, event)
+
+    def unsubscribe(self, room_id, subscription_id):
+        """구독을 해제합니다. 방의 마지막 구독이면 리스너를 닫습니다."""
+        with self._lock:
+            channel = self._channels.get(room_id)
+            if channel is None:
+                return
+            with channel.lock:
+                channel.subscribers.pop(subscription_id, None)
+                if channel.subscribers:
+                    return
+            del self._channels[room_id]
+        if not channel.listener:
+            # 리스너를 아직 여는 중: subscribe()가 연 뒤 직접 닫고 집계함
+            return
+        try:
+            channel.listener.close()
+        except Exception as e:
+            print(f"방 리스너 종료 오류: {e}")
+        with self._lock:
+            self.listeners_closed += 1
+        print(f"방 리스너 종료: {room_id}")
+
+    def _dispatch(self, channel, event):
+        with channel.lock:
+            channel.apply(event)
+            callbacks = []
+            for subscriber in channel.subscribers.values():
+                if subscriber.pending is not None:
+                    subscriber.pending.append(event)
+                else:
+                    callbacks.append(subscriber.callback)
+        with self._lock:
+            self.events_received += 1
+            self.events_dispatched += len(callbacks)
+        for callback in callbacks:
+            self._call(callback, event)
+
+    @staticmethod
+    def _call(callback, event):
+        try:
+            callback(event)
+        except Exception as e:
+            print(f"방 이벤트 콜백 오류: {e}")
+
+    def get_stats(self):
+        with self._lock:
+            channels = list(self._channels.values())
+            stats = {
+                "rooms": len(channels),
+                "listeners_opened": self.listeners_opened,
+                "listeners_closed": self.listeners_closed,
+                "events_received": self.events_received,
+                "events_dispatched": self.events_dispatched,
+            }
+        stats["subscribers"] = sum(len(c.subscribers) for c in channels)
+        return stats
+
+
+# 프로세스 전체에서 공유하는 구독 허브
+_room_hub = None
+_hub_lock = threading.Lock()
+
+
+def get_room_hub():
+    global _room_hub
+    if _room_hub is None:
+        with _hub_lock:
+            if _room_hub is None:
+                _room_hub = RoomSubscriptionHub()
+    return _room_hub
+
+
+def get_room_hub_stats():
+    return get_room_hub().get_stats()
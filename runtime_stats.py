@@ -0,0 +1,57 @@
+"""
+런타임 지표 로그
+캐시/번역/세션 등 각 모듈의 get_stats() 함수를 이름과 함께 등록해 두면,
+공용 타이머 스케줄러가 STATS_LOG_INTERVAL초마다 모듈별로 한 줄씩 출력합니다. (0이면 끔)
+"""
+
+import os
+import threading
+
+from timer_scheduler import get_scheduler
+
+STATS_LOG_INTERVAL = int(os.getenv("STATS_LOG_INTERVAL", "600"))  # 초
+
+_providers = {}  # 이름 -> 지표 dict를 반환하는 함수
+_providers_lock = threading.Lock()
+_log_handle = None
+
+
+def register_stats(name, provider):
+    """지표 함수를 등록합니다. 같은 이름이면 바꿔 끼웁니다."""
+    with _providers_lock:
+        _providers[name] = provider
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return f"{value:.3f}".rstrip('0').rstrip('.') if value else "0"
+    if isinstance(value, dict):
+        return "{" + ", ".join(f"{k}: {_format_value(v)}" for k, v in value.items()) + "}"
+    return str(value)
+
+
+def collect_stats():
+    """등록된 모든 지표를 {이름: 지표} 형태로 반환합니다."""
+    with _providers_lock:
+        providers = list(_providers.items())
+    stats = {}
+    for name, provider in providers:
+        try:
+            stats[name] = provider()
+        except Exception as e:
+            stats[name] = {"error": str(e)}
+    return stats
+
+
+def log_stats():
+    for name, stats in collect_stats().items():
+        print(f"📊 [{name}] " + ", ".join(f"{k}={_format_value(v)}" for k, v in (stats or {}).items()))
+
+
+def start_stats_logging(interval=STATS_LOG_INTERVAL):
+    """지표 로그를 주기적으로 출력합니다. 한 번만 시작됩니다."""
+    global _log_handle
+    if interval <= 0 or _log_handle is not None:
+        return
+    _log_handle = get_scheduler().call_every(interval, log_stats)
+    print(f"런타임 지표 로그 시작 ({interval}초마다)")
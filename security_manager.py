@@ -4,10 +4,30 @@ import base64
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-import sqlite3
 from datetime import datetime, timedelta
 import threading
 import time
+from timer_scheduler import get_scheduler
+from sqlite_pool import ConnectionPool, get_write_queue
+
+# 메시지 자동 삭제까지의 시간 (초)
+AUTO_DELETE_SECONDS = 24 * 60 * 60
+
+# 자주 쓰는 SQL (연결마다 문장 캐시에 올라가 재사용됨)
+INSERT_MESSAGE_SQL = '''
+    INSERT INTO messages (nickname, message, timestamp, encrypted_message)
+    VALUES (?, ?, ?, ?)
+'''
+SELECT_MESSAGES_SQL = '''
+    SELECT nickname, encrypted_message, timestamp
+    FROM messages 
+    ORDER BY timestamp DESC 
+    LIMIT ?
+'''
+BLOCK_USER_SQL = '''
+    INSERT OR REPLACE INTO blocked_users (nickname, blocked_at, blocked_by)
+    VALUES (?, ?, ?)
+'''
 
 class SecureChatManager:
     """암호화된 채팅 관리자"""
@@ -17,6 +37,12 @@ class SecureChatManager:
         self.db_path = f"storage/secure_chat_{room_id}.db"
         self.key = self._generate_key(password)
         self.cipher = Fernet(self.key)
+        # 읽기는 스레드별 연결, 쓰기는 공용 쓰기 스레드가 모아서 커밋
+        self._pool = ConnectionPool(self.db_path)
+        self._writer = get_write_queue()
+        # 가장 오래된 메시지의 만료 시각에 맞춘 자동 삭제 타이머 (방마다 하나)
+        self._auto_delete_handle = None
+        self._auto_delete_lock = threading.Lock()
         self._init_database()
         
     def _generate_key(self, password=None):
@@ -37,10 +63,10 @@ class SecureChatManager:
         return key
     
     def _init_database(self):
-        """암호화된 SQLite 데이터베이스 초기화"""
+        """암호화된 SQLite 데이터베이스 초기화 (WAL 모드)"""
         os.makedirs("storage", exist_ok=True)
         
-        conn = sqlite3.connect(self.db_path)
+        conn = self._pool.connection()
         cursor = conn.cursor()
         
         # 메시지 테이블 생성
@@ -71,7 +97,6 @@ class SecureChatManager:
         ''')
         
         conn.commit()
-        conn.close()
     
     def encrypt_message(self, message):
         """메시지 암호화"""
@@ -84,35 +109,24 @@ class SecureChatManager:
         except:
             return "[암호화된 메시지]"
     
+    def _read_connection(self):
+        """대기 중인 쓰기를 반영한 뒤 현재 스레드의 읽기 연결을 반환합니다."""
+        self._writer.flush(self.db_path)
+        return self._pool.connection()
+    
     def save_message(self, nickname, message, timestamp):
-        """암호화된 메시지 저장"""
+        """암호화된 메시지 저장 (쓰기 큐에 넣고 바로 반환)
+        반환된 Future는 커밋되면 True, 저장에 실패하면 예외로 완료됩니다. 저장을 확인하려면 result()로 기다리세요."""
         encrypted = self.encrypt_message(message)
-        
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO messages (nickname, message, timestamp, encrypted_message)
-            VALUES (?, ?, ?, ?)
-        ''', (nickname, message, timestamp, encrypted))
-        
-        conn.commit()
-        conn.close()
+        future = self._writer.submit(self.db_path, INSERT_MESSAGE_SQL, (nickname, message, timestamp, encrypted))
         
         # 24시간 후 자동 삭제 스케줄링
         self._schedule_auto_delete(timestamp)
+        return future
     
     def get_messages(self, limit=50):
         """최근 메시지 조회 (복호화)"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT nickname, encrypted_message, timestamp
-            FROM messages 
-            ORDER BY timestamp DESC 
-            LIMIT ?
-        ''', (limit,))
+        cursor = self._read_connection().execute(SELECT_MESSAGES_SQL, (limit,))
         
         messages = []
         for row in cursor.fetchall():
@@ -124,86 +138,72 @@ class SecureChatManager:
                 'timestamp': timestamp
             })
         
-        conn.close()
         return list(reversed(messages))  # 시간순 정렬
     
     def block_user(self, nickname, blocked_by="방장"):
         """사용자 차단"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT OR REPLACE INTO blocked_users (nickname, blocked_at, blocked_by)
-            VALUES (?, ?, ?)
-        ''', (nickname, time.time(), blocked_by))
-        
-        conn.commit()
-        conn.close()
+        return self._writer.submit(self.db_path, BLOCK_USER_SQL, (nickname, time.time(), blocked_by))
     
     def is_user_blocked(self, nickname):
         """사용자 차단 여부 확인"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT 1 FROM blocked_users WHERE nickname = ?', (nickname,))
-        result = cursor.fetchone()
-        
-        conn.close()
-        return result is not None
+        cursor = self._read_connection().execute('SELECT 1 FROM blocked_users WHERE nickname = ?', (nickname,))
+        return cursor.fetchone() is not None
     
     def get_blocked_users(self):
         """차단된 사용자 목록"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT nickname, blocked_at FROM blocked_users')
-        users = cursor.fetchall()
-        
-        conn.close()
-        return [{'nickname': user[0], 'blocked_at': user[1]} for user in users]
+        cursor = self._read_connection().execute('SELECT nickname, blocked_at FROM blocked_users')
+        return [{'nickname': user[0], 'blocked_at': user[1]} for user in cursor.fetchall()]
     
     def unblock_user(self, nickname):
         """사용자 차단 해제"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('DELETE FROM blocked_users WHERE nickname = ?', (nickname,))
-        
-        conn.commit()
-        conn.close()
+        return self._writer.submit(self.db_path, 'DELETE FROM blocked_users WHERE nickname = ?', (nickname,))
     
     def clear_messages(self):
         """모든 메시지 삭제"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('DELETE FROM messages')
-        
-        conn.commit()
-        conn.close()
+        return self._writer.submit(self.db_path, 'DELETE FROM messages')
     
     def _schedule_auto_delete(self, timestamp):
-        """24시간 후 자동 삭제 스케줄링"""
-        def auto_delete():
-            time.sleep(24 * 60 * 60)  # 24시간 대기
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # 24시간 이전 메시지 삭제
-            cutoff_time = time.time() - (24 * 60 * 60)
-            cursor.execute('DELETE FROM messages WHERE timestamp < ?', (cutoff_time,))
-            
-            conn.commit()
-            conn.close()
-        
-        # 백그라운드에서 실행
-        thread = threading.Thread(target=auto_delete, daemon=True)
-        thread.start()
+        """24시간 후 자동 삭제 스케줄링 (공용 스케줄러에 방마다 타이머 하나만 유지)"""
+        with self._auto_delete_lock:
+            handle = self._auto_delete_handle
+            due = timestamp + AUTO_DELETE_SECONDS
+            # 이미 더 이른 삭제가 예약되어 있으면 그때 이 메시지도 함께 처리됨
+            if handle and not handle.cancelled and handle.due <= due:
+                return
+            if handle:
+                handle.cancel()
+            self._auto_delete_handle = get_scheduler().call_later(due - time.time(), self._auto_delete)
+    
+    def _auto_delete(self):
+        """만료된 메시지를 삭제하고, 남은 메시지 중 가장 오래된 것의 만료 시각에 다시 예약합니다."""
+        with self._auto_delete_lock:
+            self._auto_delete_handle = None
+        # 24시간 이전 메시지 삭제
+        cutoff_time = time.time() - AUTO_DELETE_SECONDS
+        self._writer.submit(self.db_path, 'DELETE FROM messages WHERE timestamp < ?', (cutoff_time,))
+        oldest = self._read_connection().execute('SELECT MIN(timestamp) FROM messages').fetchone()[0]
+        
+        if oldest is not None:
+            self._schedule_auto_delete(oldest)
+    
+    def cancel_auto_delete(self):
+        """예약된 자동 삭제를 취소합니다."""
+        with self._auto_delete_lock:
+            if self._auto_delete_handle:
+                self._auto_delete_handle.cancel()
+                self._auto_delete_handle = None
     
     def destroy_room(self):
         """채팅방 완전 삭제 (데이터베이스 파일 삭제)"""
+        self.cancel_auto_delete()
+        # 파일을 지우기 전에 쓰기 스레드와 읽기 연결을 모두 닫음
+        self._writer.close_db(self.db_path)
+        self._pool.close_all()
         try:
             os.remove(self.db_path)
+            for suffix in ('-wal', '-shm'):
+                if os.path.exists(self.db_path + suffix):
+                    os.remove(self.db_path + suffix)
             return True
         except:
             return False
@@ -0,0 +1,158 @@
+"""
+세션 수명 관리
+브라우저 탭(Flet 세션)마다 열린 리스너, 타이머, 번역 작업 같은 자원을 범위(scope) 단위로 등록해 두고,
+화면을 떠나거나 세션이 끊기면(page.on_disconnect / page.on_close) 한 번에 정리합니다.
+열린 세션/범위/자원 수와 스레드 수를 지표로 제공합니다.
+"""
+
+import threading
+
+
+class SessionScope:
+    """한 화면(예: 채팅방)에서 연 자원 묶음. close()하면 등록된 정리 함수를 역순으로 실행합니다."""
+
+    def __init__(self, manager, session_id, name):
+        self.manager = manager
+        self.session_id = session_id
+        self.name = name
+        self.closed = False
+        self._cleanups = []  # (종류, 정리 함수)
+        self._lock = threading.Lock()
+
+    def add(self, kind, cleanup):
+        """정리 함수를 등록합니다. 이미 닫힌 범위면 바로 실행합니다."""
+        with self._lock:
+            if not self.closed:
+                self._cleanups.append((kind, cleanup))
+                return
+        self.manager._run_cleanup(kind, cleanup)
+
+    def resource_counts(self):
+        with self._lock:
+            counts = {}
+            for kind, _ in self._cleanups:
+                counts[kind] = counts.get(kind, 0) + 1
+            return counts
+
+    def close(self):
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            cleanups, self._cleanups = self._cleanups, []
+        for kind, cleanup in reversed(cleanups):
+            self.manager._run_cleanup(kind, cleanup)
+        self.manager._forget_scope(self)
+
+
+class SessionLifecycleManager:
+    def __init__(self):
+        self._sessions = {}  # session_id -> {범위 이름: SessionScope}
+        self._lock = threading.Lock()
+        self.closed_sessions = 0
+        self.closed_scopes = 0
+        self.cleanups_run = 0
+        self.cleanup_errors = 0
+
+    def open_scope(self, page, name):
+        """세션에 새 범위를 엽니다. 같은 이름의 범위가 열려 있으면 먼저 닫습니다 (다른 방으로 이동한 경우)."""
+        session_id = getattr(page, 'session_id', None) or id(page)
+        with self._lock:
+            is_new_session = session_id not in self._sessions
+            scopes = self._sessions.setdefault(session_id, {})
+            previous = scopes.get(name)
+            scope = SessionScope(self, session_id, name)
+            scopes[name] = scope
+        if previous:
+            previous.close()
+        if is_new_session:
+            self._hook_page(page, session_id)
+        return scope
+
+    def _hook_page(self, page, session_id):
+        """세션이 끊기거나 닫히면 세션의 모든 범위를 정리하도록 Flet 이벤트에 연결합니다."""
+        for event_name in ('on_disconnect', 'on_close'):
+            previous_handler = getattr(page, event_name, None)
+
+            def handler(e, previous_handler=previous_handler):
+                self.close_session(session_id)
+                if previous_handler:
+                    previous_handler(e)
+
+            try:
+                setattr(page, event_name, handler)
+            except Exception as e:
+                print(f"⚠️ 세션 {event_name} 연결 실패: {e}")
+
+    def close_session(self, session_id):
+        """세션의 모든 범위를 닫습니다."""
+        with self._lock:
+            scopes = self._sessions.pop(session_id, None)
+            if scopes is not None:
+                self.closed_sessions += 1
+        for scope in list((scopes or {}).values()):
+            scope.close()
+
+    def _forget_scope(self, scope):
+        with self._lock:
+            self.closed_scopes += 1
+            scopes = self._sessions.get(scope.session_id)
+            if scopes and scopes.get(scope.name) is scope:
+                del scopes[scope.name]
+
+    def _run_cleanup(self, kind, cleanup):
+        try:
+            cleanup()
+            with self._lock:
+                self.cleanups_run += 1
+        except Exception as e:
+            print(f"세션 자원 정리 오류 ({kind}): {e}")
+            with self._lock:
+                self.cleanup_errors += 1
+
+    def get_stats(self):
+        """열린 세션/범위/자원 수와 스레드 수를 반환합니다."""
+        with self._lock:
+            scopes = [scope for scopes in self._sessions.values() for scope in scopes.values()]
+            stats = {
+                "live_sessions": len(self._sessions),
+                "open_scopes": len(scopes),
+                "closed_sessions": self.closed_sessions,
+                "closed_scopes": self.closed_scopes,
+                "cleanups_run": self.cleanups_run,
+                "cleanup_errors": self.cleanup_errors,
+            }
+        resources = {}
+        for scope in scopes:
+            for kind, count in scope.resource_counts().items():
+                resources[kind] = resources.get(kind, 0) + count
+        stats["open_resources"] = resources
+        stats["threads"] = threading.active_count()
+        return stats
+
+
+# 프로세스 전체에서 공유하는 세션 수명 관리자
+_session_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_session_manager():
+    global _session_manager
+    if _session_manager is None:
+        with _manager_lock:
+            if _session_manager is None:
+                _session_manager = SessionLifecycleManager()
+    return _session_manager
+
+
+def get_session_stats():
+    """세션 지표에 방 리스너 수를 더해 반환합니다."""
+    stats = get_session_manager().get_stats()
+    try:
+        from room_subscription_hub import get_room_hub_stats
+        hub_stats = get_room_hub_stats()
+        stats["room_listeners"] = hub_stats["rooms"]
+        stats["room_subscribers"] = hub_stats["subscribers"]
+    except Exception as e:
+        print(f"방 리스너 지표 조회 오류: {e}")
+    return stats
@@ -0,0 +1,223 @@
+"""
+SQLite 연결 풀과 쓰기 지연(write-behind) 큐
+- 데이터베이스 파일마다 스레드별 연결을 하나씩 만들어 재사용합니다 (WAL 모드, 문장 캐시 사용).
+- 쓰기는 큐에 넣고 프로세스 전체에서 하나뿐인 쓰기 스레드가 모아서 처리합니다.
+  같은 SQL이 연속되면 executemany로 묶고, 파일마다 배치당 한 번만 커밋합니다.
+- 읽기 전에 flush()를 호출하면 그때까지 넣은 쓰기가 반영된 뒤에 읽습니다.
+- submit()은 Future를 반환합니다. 커밋되면 True, 실행/커밋이 실패하면 그 예외로 완료되며
+  실패한 쓰기 수는 get_stats()의 failed_writes로 집계됩니다.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+
+SQLITE_TIMEOUT = float(os.getenv("SQLITE_TIMEOUT", "5"))  # 초
+SQLITE_WRITE_BATCH = int(os.getenv("SQLITE_WRITE_BATCH", "500"))
+
+
+def connect(db_path):
+    """WAL 모드로 SQLite 연결을 엽니다."""
+    conn = sqlite3.connect(db_path, timeout=SQLITE_TIMEOUT, check_same_thread=False, cached_statements=256)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+class ConnectionPool:
+    """데이터베이스 파일 하나에 대한 스레드별 연결. 만든 연결은 모두 목록에 두어 close_all()에서 함께 닫습니다."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = connect(self.db_path)
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def close_all(self):
+        """모든 스레드의 연결을 닫습니다. (파일을 지우기 전 등에만 사용)"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        self._local = threading.local()
+        for conn in connections:
+            try:
+                conn.close()
+            except Exception as e:
+                print(f"SQLite 연결 종료 오류: {e}")
+
+
+class WriteBehindQueue:
+    def __init__(self, max_batch=SQLITE_WRITE_BATCH):
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._connections = {}  # db_path -> 쓰기 스레드 전용 연결
+        self._pending = {}      # db_path -> 아직 커밋되지 않은 쓰기 수
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.statements = 0
+        self.errors = 0
+        self.failed_writes = 0
+        threading.Thread(target=self._run, name="sqlite-writer", daemon=True).start()
+
+    def submit(self, db_path, sql, params=()):
+        """쓰기를 큐에 넣고 Future를 반환합니다. 실제 실행과 커밋은 쓰기 스레드에서 합니다."""
+        future = Future()
+        with self._lock:
+            self._pending[db_path] = self._pending.get(db_path, 0) + 1
+        self._queue.put(('write', db_path, sql, params, future))
+        return future
+
+    def flush(self, db_path=None, timeout=None):
+        """지금까지 넣은 쓰기가 커밋될 때까지 기다립니다. 대기 중인 쓰기가 없으면 바로 반환합니다."""
+        with self._lock:
+            if db_path is not None and not self._pending.get(db_path):
+                return True
+            if db_path is None and not any(self._pending.values()):
+                return True
+        done = threading.Event()
+        self._queue.put(('flush', done))
+        return done.wait(timeout)
+
+    def close_db(self, db_path):
+        """파일의 쓰기를 모두 반영하고 쓰기 스레드의 연결을 닫습니다."""
+        done = threading.Event()
+        self._queue.put(('close', db_path, done))
+        done.wait()
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+            while len(items) < self.max_batch:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._process(items)
+
+    def _process(self, items):
+        touched = {}   # db_path -> 이번 배치에서 실행에 성공한 쓰기의 Future 목록
+        signals = []   # 배치를 커밋한 뒤 알려 줄 flush/close 요청
+        run = []       # 같은 (db_path, sql)이 연속된 쓰기 묶음
+        for item in items:
+            if item[0] == 'write':
+                _, db_path, sql, _, _ = item
+                if run and (run[0][1], run[0][2]) != (db_path, sql):
+                    self._execute(run, touched)
+                    run = []
+                run.append(item)
+            else:
+                if run:
+                    self._execute(run, touched)
+                    run = []
+                if item[0] == 'close':
+                    # 닫기 전에 그때까지의 쓰기를 커밋
+                    self._commit(touched)
+                    touched = {}
+                    conn = self._connections.pop(item[1], None)
+                    if conn:
+                        conn.close()
+                signals.append(item[-1])
+        if run:
+            self._execute(run, touched)
+        self._commit(touched)
+        for done in signals:
+            done.set()
+
+    def _execute(self, run, touched):
+        db_path, sql = run[0][1], run[0][2]
+        futures = [item[4] for item in run]
+        try:
+            conn = self._connections.get(db_path)
+            if conn is None:
+                conn = connect(db_path)
+                self._connections[db_path] = conn
+            # 실패한 묶음만 되돌리도록 세이브포인트 안에서 실행 (같은 배치의 다른 쓰기는 유지)
+            if not conn.in_transaction:
+                conn.execute('BEGIN')
+            conn.execute('SAVEPOINT write_run')
+            try:
+                if len(run) == 1:
+                    conn.execute(sql, run[0][3])
+                else:
+                    conn.executemany(sql, [item[3] for item in run])
+            except Exception:
+                conn.execute('ROLLBACK TO write_run')
+                raise
+            finally:
+                conn.execute('RELEASE write_run')
+            self.statements += len(run)
+            touched.setdefault(db_path, []).extend(futures)
+        except Exception as e:
+            print(f"❌ SQLite 쓰기 실패 ({db_path}, {len(run)}건): {e}")
+            self._fail(db_path, futures, e)
+
+    def _commit(self, touched):
+        for db_path, futures in touched.items():
+            conn = self._connections.get(db_path)
+            try:
+                if conn:
+                    conn.commit()
+            except Exception as e:
+                print(f"❌ SQLite 커밋 실패 ({db_path}, {len(futures)}건): {e}")
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+                self._fail(db_path, futures, e)
+                continue
+            self._done(db_path, len(futures))
+            for future in futures:
+                future.set_result(True)
+        if touched:
+            self.batches += 1
+
+    def _fail(self, db_path, futures, error):
+        self.errors += 1
+        self.failed_writes += len(futures)
+        self._done(db_path, len(futures))
+        for future in futures:
+            future.set_exception(error)
+
+    def _done(self, db_path, count):
+        with self._lock:
+            remaining = self._pending.get(db_path, 0) - count
+            if remaining > 0:
+                self._pending[db_path] = remaining
+            else:
+                self._pending.pop(db_path, None)
+
+    def get_stats(self):
+        with self._lock:
+            pending = sum(self._pending.values())
+        return {
+            "pending": pending,
+            "batches": self.batches,
+            "statements": self.statements,
+            "errors": self.errors,
+            "failed_writes": self.failed_writes,
+            "open_files": len(self._connections),
+        }
+
+
+# 프로세스 전체에서 공유하는 쓰기 큐 (쓰기 스레드 하나)
+_write_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_write_queue():
+    global _write_queue
+    if _write_queue is None:
+        with _queue_lock:
+            if _write_queue is None:
+                _write_queue = WriteBehindQueue()
+    return _write_queue
@@ -0,0 +1,151 @@
+"""
+공용 타이머 스케줄러
+지연 실행/주기 실행 작업을 작업마다 잠자는 스레드를 만드는 대신
+스레드 하나가 힙(실행 시각 순)으로 관리합니다. 때가 된 작업은 작은 워커 풀(TIMER_WORKERS개)에서 실행합니다.
+예약한 작업은 핸들의 cancel()로 취소할 수 있습니다.
+
+워커는 프로세스의 모든 세션이 함께 쓰므로, 콜백은 짧고 막히지 않는 작업만 등록합니다.
+번역/네트워크 대기나 세션마다 자주 반복되는 화면 반영(예: 채팅 메시지 반영)은 워커를 붙잡아
+다른 방의 타이머까지 늦추므로 세션 전용 스레드에서 처리합니다.
+"""
+
+import heapq
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+TIMER_WORKERS = int(os.getenv("TIMER_WORKERS", "4"))
+
+
+class TimerHandle:
+    """call_later/call_every가 반환하는 핸들"""
+
+    def __init__(self, scheduler, due, callback, args, interval=None):
+        self.scheduler = scheduler
+        self.due = due
+        self.callback = callback
+        self.args = args
+        self.interval = interval
+        self.cancelled = False
+        self.in_heap = False
+
+    def cancel(self):
+        if not self.cancelled:
+            self.cancelled = True
+            self.scheduler._on_cancel(self)
+
+
+class TimerScheduler:
+    def __init__(self, max_workers=TIMER_WORKERS):
+        self._heap = []  # (실행 시각, 순번, 핸들)
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="timer")
+        self._thread = None
+        self._cancelled_in_heap = 0
+        self.scheduled = 0
+        self.fired = 0
+        self.cancelled = 0
+        self.errors = 0
+
+    def call_later(self, delay, callback, *args):
+        """delay초 뒤에 callback(*args)를 한 번 실행합니다."""
+        return self._schedule(TimerHandle(self, time.time() + max(0.0, delay), callback, args))
+
+    def call_every(self, interval, callback, *args, first_delay=None):
+        """interval초마다 callback(*args)를 실행합니다. 첫 실행은 first_delay(기본 interval)초 뒤."""
+        first_delay = interval if first_delay is None else first_delay
+        return self._schedule(TimerHandle(self, time.time() + max(0.0, first_delay), callback, args, interval))
+
+    def _schedule(self, handle):
+        with self._cond:
+            heapq.heappush(self._heap, (handle.due, next(self._counter), handle))
+            handle.in_heap = True
+            self.scheduled += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="timer-scheduler", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return handle
+
+    def _on_cancel(self, handle):
+        with self._cond:
+            self.cancelled += 1
+            if not handle.in_heap:
+                return
+            self._cancelled_in_heap += 1
+            # 취소된 항목이 힙의 절반을 넘으면 정리
+            if self._cancelled_in_heap > 64 and self._cancelled_in_heap * 2 > len(self._heap):
+                for entry in self._heap:
+                    if entry[2].cancelled:
+                        entry[2].in_heap = False
+                self._heap = [entry for entry in self._heap if not entry[2].cancelled]
+                heapq.heapify(self._heap)
+                self._cancelled_in_heap = 0
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    due, _, handle = self._heap[0]
+                    if handle.cancelled:
+                        heapq.heappop(self._heap)
+                        handle.in_heap = False
+                        self._cancelled_in_heap -= 1
+                        continue
+                    remaining = due - time.time()
+                    if remaining <= 0:
+                        heapq.heappop(self._heap)
+                        handle.in_heap = False
+                        break
+                    self._cond.wait(remaining)
+                if handle.interval is not None:
+                    handle.due = max(due + handle.interval, time.time())
+                    heapq.heappush(self._heap, (handle.due, next(self._counter), handle))
+                    handle.in_heap = True
+            self._executor.submit(self._fire, handle)
+
+    def _fire(self, handle):
+        if handle.cancelled:
+            return
+        try:
+            handle.callback(*handle.args)
+            with self._cond:
+                self.fired += 1
+        except Exception as e:
+            print(f"타이머 작업 오류: {e}")
+            with self._cond:
+                self.errors += 1
+
+    def get_stats(self):
+        with self._cond:
+            return {
+                "pending": len(self._heap) - self._cancelled_in_heap,
+                "scheduled": self.scheduled,
+                "fired": self.fired,
+                "cancelled": self.cancelled,
+                "errors": self.errors,
+            }
+
+
+# 프로세스 전체에서 공유하는 스케줄러
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = TimerScheduler()
+    return _scheduler
+
+
+def get_scheduler_stats():
+    return get_scheduler().get_stats()
@@ -0,0 +1,185 @@
+"""
+번역 마이크로 배치
+번역 요청을 모아 JSON 형식의 프롬프트 하나로 번역하고, 결과를 기다리던 호출자들에게 나눠 줍니다.
+진행 중인 배치가 없으면 요청을 바로 보내고, 진행 중인 배치가 있을 때만 짧은 시간(기본 40ms) 동안 모읍니다.
+메시지가 몰릴 때 요청 수를 줄입니다. 응답을 해석하지 못한 항목은 개별 호출로 다시 번역합니다.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from llm_client import generate_text
+
+TRANSLATION_BATCH_WINDOW = float(os.getenv("TRANSLATION_BATCH_WINDOW", "0.04"))  # 초
+TRANSLATION_BATCH_SIZE = int(os.getenv("TRANSLATION_BATCH_SIZE", "16"))
+
+# 언어 코드 → 영어 언어명 매핑
+LANG_NAMES = {
+    "en": "English", "ko": "Korean", "ja": "Japanese", "zh": "Chinese", "zh-TW": "Traditional Chinese", "id": "Indonesian", "vi": "Vietnamese", "fr": "French", "de": "German", "th": "Thai", "uz": "Uzbek", "ne": "Nepali", "tet": "Tetum", "lo": "Lao", "mn": "Mongolian", "my": "Burmese", "bn": "Bengali", "si": "Sinhala", "km": "Khmer", "ky": "Kyrgyz", "ur": "Urdu"
+}
+
+SINGLE_GENERATION_CONFIG = {"max_output_tokens": 512, "temperature": 0.2}
+
+
+def build_single_prompt(text, target_lang):
+    target_lang_name = LANG_NAMES.get(target_lang, target_lang)
+    return f"Translate the following text to {target_lang_name} and return only the translation.\n{text}"
+
+
+def build_batch_prompt(items):
+    """items: (원문, 대상 언어) 목록. 항목 번호는 목록 순서입니다."""
+    payload = [
+        {"id": i, "target": LANG_NAMES.get(lang, lang), "text": text}
+        for i, (text, lang) in enumerate(items)
+    ]
+    return (
+        "Translate the \"text\" of each item below into the language given in its \"target\".\n"
+        "Return only a JSON array of objects of the form {\"id\": <same id>, \"translation\": \"...\"}, "
+        "one per item, with no other commentary.\n"
+        + json.dumps(payload, ensure_ascii=False)
+    )
+
+
+def parse_batch_response(response, count):
+    """배치 응답에서 {항목 번호: 번역문}을 추출합니다. 형식이 잘못된 항목은 빠집니다."""
+    text = re.sub(r"^```(?:json)?\s*|\s*```$", "", response.strip())
+    data = json.loads(text)
+    results = {}
+    if not isinstance(data, list):
+        return results
+    for item in data:
+        if not isinstance(item, dict):
+            continue
+        item_id, translation = item.get("id"), item.get("translation")
+        if isinstance(item_id, int) and 0 <= item_id < count and isinstance(translation, str) and translation.strip():
+            results[item_id] = translation.strip()
+    return results
+
+
+class TranslationBatcher:
+    def __init__(self, api_key, window=TRANSLATION_BATCH_WINDOW, max_items=TRANSLATION_BATCH_SIZE, max_workers=4):
+        self.api_key = api_key
+        self.window = window
+        self.max_items = max_items
+        self._queue = []  # (원문, 대상 언어, Future)
+        self._in_flight = 0  # 처리 중인 배치 수
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="translation-batch")
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.batched_items = 0
+        self.single_calls = 0
+        self.fallbacks = 0
+        threading.Thread(target=self._collect_loop, daemon=True).start()
+
+    def translate(self, text, target_lang, timeout=None):
+        """번역을 요청하고 결과를 기다립니다. 번역 실패 시 예외가 발생합니다."""
+        return self.submit(text, target_lang).result(timeout)
+
+    def submit(self, text, target_lang):
+        """번역을 큐에 넣고 Future를 반환합니다."""
+        future = Future()
+        with self._cond:
+            self._queue.append((text, target_lang, future))
+            self._cond.notify()
+        return future
+
+    def _collect_loop(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                # 다른 배치가 처리 중일 때만 window 동안 또는 max_items개가 될 때까지 모음
+                # (한가할 때 들어온 단일 요청은 기다리지 않고 바로 보냄)
+                if self._in_flight:
+                    deadline = time.time() + self.window
+                    while len(self._queue) < self.max_items:
+                        remaining = deadline - time.time()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                batch = self._queue[:self.max_items]
+                self._queue = self._queue[self.max_items:]
+                self._in_flight += 1
+            self._executor.submit(self._process, batch)
+
+    def _process(self, batch):
+        try:
+            self._translate_batch(batch)
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+
+    def _translate_batch(self, batch):
+        # 같은 (원문, 언어) 요청은 한 번만 번역
+        waiting = {}
+        for text, lang, future in batch:
+            waiting.setdefault((text, lang), []).append(future)
+        items = list(waiting)
+
+        results = {}
+        if len(items) > 1:
+            try:
+                response = generate_text(
+                    self.api_key,
+                    build_batch_prompt(items),
+                    {"max_output_tokens": min(512 * len(items), 8192), "temperature": 0.2,
+                     "response_mime_type": "application/json"}
+                )
+                results = parse_batch_response(response, len(items))
+                with self._stats_lock:
+                    self.batches += 1
+                    self.batched_items += len(results)
+            except Exception as e:
+                print(f"⚠️ 배치 번역 실패, 개별 번역으로 처리합니다: {e}")
+
+        for i, (text, lang) in enumerate(items):
+            futures = waiting[(text, lang)]
+            if i in results:
+                for future in futures:
+                    future.set_result(results[i])
+                continue
+            # 단일 요청이거나 배치 응답에서 빠진 항목은 개별 호출
+            with self._stats_lock:
+                self.single_calls += 1
+                self.fallbacks += 1 if len(items) > 1 else 0
+            try:
+                translated = generate_text(self.api_key, build_single_prompt(text, lang), SINGLE_GENERATION_CONFIG)
+                for future in futures:
+                    future.set_result(translated)
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+
+    def get_stats(self):
+        with self._stats_lock:
+            return {
+                "batches": self.batches,
+                "batched_items": self.batched_items,
+                "avg_batch_size": round(self.batched_items / self.batches, 2) if self.batches else 0.0,
+                "single_calls": self.single_calls,
+                "fallbacks": self.fallbacks,
+                "queued": len(self._queue),
+            }
+
+
+# 프로세스 전체에서 공유하는 번역 배처
+_translation_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_translation_batcher(api_key):
+    global _translation_batcher
+    if _translation_batcher is None:
+        with _batcher_lock:
+            if _translation_batcher is None:
+                _translation_batcher = TranslationBatcher(api_key)
+    return _translation_batcher
+
+
+def get_translation_batcher_stats():
+    return _translation_batcher.get_stats() if _translation_batcher else {}
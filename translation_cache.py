@@ -0,0 +1,213 @@
+"""
+번역 결과 캐시
+(정규화된 원문, 대상 언어) 별로 번역문을 메모리 LRU와 선택적 SQLite 저장소에 보관하여
+인사말, 안내 문구처럼 자주 반복되는 문장은 Gemini 호출 없이 바로 반환합니다.
+항목마다 TTL이 있고, 너무 긴 원문은 캐시하지 않습니다.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from language_detector import detect_language
+
+# 빈 문자열로 설정하면 디스크 저장소를 사용하지 않습니다
+TRANSLATION_CACHE_PATH = os.getenv("TRANSLATION_CACHE_PATH", "storage/translation_cache.db")
+TRANSLATION_CACHE_SIZE = int(os.getenv("TRANSLATION_CACHE_SIZE", "5000"))
+TRANSLATION_CACHE_TTL = int(os.getenv("TRANSLATION_CACHE_TTL", str(7 * 24 * 60 * 60)))  # 초
+TRANSLATION_CACHE_MAX_TEXT = int(os.getenv("TRANSLATION_CACHE_MAX_TEXT", "2000"))  # 글자 수
+
+
+def normalize_text(text):
+    """캐시 키로 쓸 수 있도록 원문을 정규화합니다. (대소문자는 번역에 영향을 줄 수 있어 유지)"""
+    text = unicodedata.normalize("NFC", str(text))
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class TranslationCache:
+    def __init__(self, max_size=TRANSLATION_CACHE_SIZE, ttl=TRANSLATION_CACHE_TTL,
+                 max_text_length=TRANSLATION_CACHE_MAX_TEXT, db_path=TRANSLATION_CACHE_PATH):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_text_length = max_text_length
+        self.db_path = db_path or None
+        # (정규화 원문, 대상 언어) -> (번역문, 저장 시각)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # "원문 언어->대상 언어" -> {"hits", "disk_hits", "misses"}
+        self._pair_stats = {}
+        self.evictions = 0
+        if self.db_path:
+            self._init_database()
+
+    def _init_database(self):
+        """디스크 캐시용 SQLite 테이블을 생성합니다."""
+        try:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path)
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS translations (
+                    text TEXT NOT NULL,
+                    target_lang TEXT NOT NULL,
+                    translated TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (text, target_lang)
+                )
+            ''')
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"❌ 번역 디스크 캐시 초기화 실패, 메모리 캐시만 사용합니다: {e}")
+            self.db_path = None
+
+    def _record(self, text, target_lang, field):
+        pair = f"{detect_language(text)}->{target_lang}"
+        stats = self._pair_stats.setdefault(pair, {"hits": 0, "disk_hits": 0, "misses": 0})
+        stats[field] += 1
+
+    def get(self, text, target_lang):
+        """캐시된 번역문을 반환합니다. 없거나 만료되었으면 None."""
+        key = (normalize_text(text), target_lang)
+        if len(key[0]) > self.max_text_length:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now - entry[1] <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self._record(key[0], target_lang, "hits")
+                    return entry[0]
+                del self._entries[key]
+        entry = self._load_from_disk(key, now)
+        with self._lock:
+            if entry is None:
+                self._record(key[0], target_lang, "misses")
+                return None
+            self._record(key[0], target_lang, "disk_hits")
+            self._put_memory(key, entry)
+        return entry[0]
+
+    def put(self, text, target_lang, translated):
+        key = (normalize_text(text), target_lang)
+        if not translated or len(key[0]) > self.max_text_length:
+            return
+        entry = (translated, time.time())
+        with self._lock:
+            self._put_memory(key, entry)
+        self._save_to_disk(key, entry)
+
+    def get_or_translate(self, text, target_lang, translate):
+        """캐시에 없으면 translate()로 번역해 저장한 뒤 반환합니다."""
+        translated = self.get(text, target_lang)
+        if translated is None:
+            translated = translate()
+            self.put(text, target_lang, translated)
+        return translated
+
+    def _put_memory(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _load_from_disk(self, key, now):
+        if not self.db_path:
+            return None
+        try:
+            conn = sqlite3.connect(self.db_path)
+            row = conn.execute(
+                'SELECT translated, created_at FROM translations WHERE text = ? AND target_lang = ?',
+                key
+            ).fetchone()
+            conn.close()
+        except Exception as e:
+            print(f"❌ 번역 디스크 캐시 조회 실패: {e}")
+            return None
+        if row is None or now - row[1] > self.ttl:
+            return None
+        return row[0], row[1]
+
+    def _save_to_disk(self, key, entry):
+        if not self.db_path:
+            return
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute(
+                'INSERT OR REPLACE INTO translations (text, target_lang, translated, created_at) VALUES (?, ?, ?, ?)',
+                key + entry
+            )
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"❌ 번역 디스크 캐시 저장 실패: {e}")
+
+    def purge_expired(self):
+        """만료된 항목을 메모리와 디스크에서 지웁니다."""
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if e[1] < cutoff]:
+                del self._entries[key]
+        if not self.db_path:
+            return
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute('DELETE FROM translations WHERE created_at < ?', (cutoff,))
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"❌ 번역 디스크 캐시 정리 실패: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._pair_stats.clear()
+            self.evictions = 0
+
+    def get_stats(self):
+        """전체 및 언어 쌍별 캐시 적중률을 반환합니다."""
+        with self._lock:
+            pairs = {}
+            totals = {"hits": 0, "disk_hits": 0, "misses": 0}
+            for pair, stats in self._pair_stats.items():
+                total = stats["hits"] + stats["disk_hits"] + stats["misses"]
+                pairs[pair] = dict(stats, hit_rate=(stats["hits"] + stats["disk_hits"]) / total if total else 0.0)
+                for field in totals:
+                    totals[field] += stats[field]
+            total = sum(totals.values())
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": totals["hits"],
+                "disk_hits": totals["disk_hits"],
+                "misses": totals["misses"],
+                "hit_rate": (totals["hits"] + totals["disk_hits"]) / total if total else 0.0,
+                "evictions": self.evictions,
+                "disk_enabled": bool(self.db_path),
+                "pairs": pairs,
+            }
+
+
+# 프로세스 전체에서 공유하는 번역 캐시
+_translation_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_translation_cache():
+    global _translation_cache
+    if _translation_cache is None:
+        with _cache_lock:
+            if _translation_cache is None:
+                _translation_cache = TranslationCache()
+    return _translation_cache
+
+
+def get_translation_cache_stats():
+    return get_translation_cache().get_stats()
@@ -0,0 +1,89 @@
+"""
+비동기 번역 파이프라인
+메시지 번역을 공용 워커 풀에서 처리하고, 채팅방마다 동시에 진행되는 번역 수를 제한합니다.
+한 방에서 번역이 몰려도 다른 방의 번역이 밀리지 않도록 방별 대기열을 따로 둡니다.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+TRANSLATION_WORKERS = int(os.getenv("TRANSLATION_WORKERS", "8"))
+TRANSLATION_MAX_PER_ROOM = int(os.getenv("TRANSLATION_MAX_PER_ROOM", "2"))
+
+
+class TranslationPipeline:
+    def __init__(self, translate_func, max_workers=TRANSLATION_WORKERS, max_per_room=TRANSLATION_MAX_PER_ROOM):
+        """translate_func(text, target_lang) -> 번역문"""
+        self.translate_func = translate_func
+        self.max_per_room = max_per_room
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="translation")
+        self._lock = threading.Lock()
+        self._running = {}   # room_id -> 진행 중인 번역 수
+        self._pending = {}   # room_id -> 대기 중인 작업
+        self.completed = 0
+        self.failed = 0
+        self.total_latency = 0.0
+
+    def submit(self, room_id, text, target_lang, on_done, owner=None):
+        """번역을 예약합니다. 번역이 끝나면 워커 스레드에서 on_done(번역문)을 호출합니다."""
+        job = (text, target_lang, on_done, time.time(), owner)
+        with self._lock:
+            if self._running.get(room_id, 0) >= self.max_per_room:
+                self._pending.setdefault(room_id, deque()).append(job)
+                return
+            self._running[room_id] = self._running.get(room_id, 0) + 1
+        self._executor.submit(self._run, room_id, job)
+
+    def _run(self, room_id, job):
+        while job is not None:
+            text, target_lang, on_done, queued_at, _ = job
+            try:
+                translated = self.translate_func(text, target_lang)
+                on_done(translated)
+                with self._lock:
+                    self.completed += 1
+                    self.total_latency += time.time() - queued_at
+            except Exception as e:
+                print(f"비동기 번역 오류: {e}")
+                with self._lock:
+                    self.failed += 1
+            # 같은 방의 대기 작업을 이어서 처리 (방별 동시 번역 수 유지)
+            with self._lock:
+                pending = self._pending.get(room_id)
+                if pending:
+                    job = pending.popleft()
+                    if not pending:
+                        del self._pending[room_id]
+                else:
+                    job = None
+                    self._running[room_id] -= 1
+                    if self._running[room_id] == 0:
+                        del self._running[room_id]
+
+    def cancel(self, owner):
+        """owner가 예약한 대기 중인 번역을 취소합니다. (이미 진행 중인 번역은 끝까지 실행됨)"""
+        cancelled = 0
+        with self._lock:
+            for room_id in list(self._pending):
+                pending = self._pending[room_id]
+                kept = deque(job for job in pending if job[4] is not owner)
+                cancelled += len(pending) - len(kept)
+                if kept:
+                    self._pending[room_id] = kept
+                else:
+                    del self._pending[room_id]
+        return cancelled
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "running": sum(self._running.values()),
+                "pending": sum(len(q) for q in self._pending.values()),
+                "active_rooms": len(self._running),
+                "completed": self.completed,
+                "failed": self.failed,
+                "avg_latency": round(self.total_latency / self.completed, 3) if self.completed else 0.0,
+            }
@@ -0,0 +1,113 @@
+"""
+벡터DB 지연 로딩 레지스트리
+앱 시작 시 백그라운드 스레드에서 벡터DB들을 순서대로 로드하고,
+필요한 DB가 아직 준비되지 않았으면 그 DB만 기다립니다.
+"""
+
+import threading
+import time
+
+STATUS_PENDING = "pending"
+STATUS_LOADING = "loading"
+STATUS_LOADED = "loaded"
+STATUS_MISSING = "missing"
+STATUS_FAILED = "failed"
+
+
+class _Entry:
+    def __init__(self, name, loader, description):
+        self.name = name
+        self.loader = loader
+        self.description = description or name
+        self.status = STATUS_PENDING
+        self.value = None
+        self.error = None
+        self.started_at = None
+        self.elapsed = None
+        self.ready = threading.Event()
+
+
+class VectorDBRegistry:
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def register(self, name, loader, description=None):
+        """로더 함수를 등록합니다. 로더가 None을 반환하면 '파일 없음'으로 처리합니다."""
+        with self._lock:
+            self._entries[name] = _Entry(name, loader, description)
+
+    def start_background_loading(self):
+        """등록된 모든 DB를 백그라운드 스레드에서 순서대로 로드합니다."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._load_all, name="vector-db-loader", daemon=True)
+        self._thread.start()
+
+    def _load_all(self):
+        for name in list(self._entries):
+            self._load(name)
+        print(f"✅ 벡터DB 백그라운드 로딩 완료: {self.get_progress()['summary']}")
+
+    def _load(self, name):
+        entry = self._entries[name]
+        with self._lock:
+            if entry.status != STATUS_PENDING:
+                return
+            entry.status = STATUS_LOADING
+            entry.started_at = time.time()
+        print(f"{entry.description} 로드 시작...")
+        try:
+            value = entry.loader()
+            entry.value = value
+            entry.status = STATUS_LOADED if value is not None else STATUS_MISSING
+        except Exception as e:
+            print(f"❌ {entry.description} 로드 중 오류 발생: {e}")
+            entry.error = str(e)
+            entry.status = STATUS_FAILED
+        entry.elapsed = time.time() - entry.started_at
+        print(f"{entry.description} 로드 종료 ({entry.status}, {entry.elapsed:.1f}초)")
+        entry.ready.set()
+
+    def get(self, name, timeout=None):
+        """DB를 반환합니다. 아직 로드 전이면 현재 스레드에서 바로 로드하고, 로드 중이면 끝날 때까지 기다립니다."""
+        entry = self._entries.get(name)
+        if entry is None:
+            return None
+        if not entry.ready.is_set():
+            self._load(name)
+            entry.ready.wait(timeout)
+        return entry.value
+
+    def is_ready(self, name):
+        entry = self._entries.get(name)
+        return entry is not None and entry.ready.is_set()
+
+    def get_progress(self):
+        """각 DB의 로딩 상태와 전체 진행률을 반환합니다."""
+        entries = {}
+        for name, entry in list(self._entries.items()):
+            elapsed = entry.elapsed
+            if elapsed is None and entry.started_at is not None:
+                elapsed = time.time() - entry.started_at
+            entries[name] = {
+                "status": entry.status,
+                "elapsed": round(elapsed, 2) if elapsed is not None else None,
+                "error": entry.error,
+            }
+        done = sum(1 for e in entries.values() if e["status"] not in (STATUS_PENDING, STATUS_LOADING))
+        return {
+            "entries": entries,
+            "done": done,
+            "total": len(entries),
+            "summary": f"{done}/{len(entries)}",
+        }
+
+    def get_stats(self):
+        """지표 로그용 요약: 진행률과 DB별 상태(로드 시간)."""
+        progress = self.get_progress()
+        stats = {"loaded": progress["summary"]}
+        for name, entry in progress["entries"].items():
+            stats[name] = entry["status"] if entry["elapsed"] is None else f"{entry['status']}({entry['elapsed']}s)"
+        return stats
@@ -0,0 +1,213 @@
+"""
+메모리 매핑 벡터 저장소
+피클 대신 다음 파일들로 벡터DB를 저장하고, np.load(mmap_mode='r')로 로드합니다.
+  - {prefix}.vectors.npy   : float32 임베딩 행렬
+  - {prefix}.docs.jsonl    : 문서(한 줄에 하나, JSON)
+  - {prefix}.docs.idx.npy  : 각 문서 줄의 바이트 오프셋 (문서 수 + 1개)
+  - {prefix}.meta.json     : 문서 수, 차원, 정규화 여부 등
+  - {prefix}.meta_index.json : 메타데이터 필터용 (필드, 값) -> 문서 id 역색인
+임베딩 행렬과 문서 파일은 OS 페이지 캐시를 통해 워커 프로세스 간에 공유됩니다.
+문서는 검색 결과로 꺼낼 때만 JSON을 해석하며, 로드 시점에는 역색인 파일만 읽습니다.
+
+사용법: python vector_store.py 다문화.pkl [출력 prefix]
+"""
+
+import json
+import mmap
+import os
+import pickle
+import sys
+
+import numpy as np
+
+from rag_utils import INDEXED_METADATA_FIELDS, SimpleVectorDB, build_metadata_index, get_embeddings_sidecar_path
+
+
+def get_store_prefix(db_path):
+    """피클 경로에 대응하는 벡터 저장소 prefix를 반환합니다."""
+    return os.path.splitext(db_path)[0]
+
+
+def _store_paths(prefix):
+    return {
+        "vectors": f"{prefix}.vectors.npy",
+        "docs": f"{prefix}.docs.jsonl",
+        "index": f"{prefix}.docs.idx.npy",
+        "meta": f"{prefix}.meta.json",
+    }
+
+
+def _metadata_index_path(prefix):
+    # 역색인 파일이 없는 이전 저장소도 열 수 있도록 _store_paths()와 따로 둡니다
+    return f"{prefix}.meta_index.json"
+
+
+def vector_store_exists(prefix):
+    return all(os.path.exists(path) for path in _store_paths(prefix).values())
+
+
+def save_metadata_index(prefix, index, count):
+    """메타데이터 역색인을 저장합니다. JSON 키는 문자열만 되므로 [필드, 값, id 목록] 목록으로 씁니다."""
+    data = {
+        "count": count,
+        "fields": list(INDEXED_METADATA_FIELDS),
+        "entries": [[field, value, ids] for (field, value), ids in index.items()],
+    }
+    with open(_metadata_index_path(prefix), "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+def load_metadata_index(prefix, count):
+    """저장된 메타데이터 역색인을 읽습니다. 파일이 없거나 문서 수/색인 필드가 다르면 None."""
+    path = _metadata_index_path(prefix)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("count") != count or data.get("fields") != list(INDEXED_METADATA_FIELDS):
+            return None
+        return {(field, value): ids for field, value, ids in data["entries"]}
+    except Exception as e:
+        print(f"⚠️ 메타데이터 역색인 로드 오류: {path} ({e})")
+        return None
+
+
+def save_vector_store(prefix, documents, embeddings, normalize=True, extra=None):
+    """문서와 임베딩을 메모리 매핑 가능한 형식으로 저장합니다."""
+    paths = _store_paths(prefix)
+    matrix = np.ascontiguousarray(np.asarray(embeddings, dtype=np.float32))
+    if matrix.ndim != 2 or len(matrix) != len(documents):
+        raise ValueError(f"임베딩 형태 {matrix.shape}가 문서 수 {len(documents)}와 맞지 않습니다.")
+    if normalize:
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix = matrix / norms
+
+    offsets = np.zeros(len(documents) + 1, dtype=np.int64)
+    with open(paths["docs"], "wb") as f:
+        for i, doc in enumerate(documents):
+            f.write(json.dumps(doc, ensure_ascii=False).encode("utf-8") + b"\n")
+            offsets[i + 1] = f.tell()
+    np.save(paths["index"], offsets)
+    np.save(paths["vectors"], matrix)
+    save_metadata_index(prefix, build_metadata_index(documents), len(documents))
+
+    meta = {
+        "count": len(documents),
+        "dim": int(matrix.shape[1]),
+        "normalized": bool(normalize),
+        "extra": extra or {},
+    }
+    with open(paths["meta"], "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    print(f"✅ 벡터 저장소 저장 완료: {prefix} ({len(documents)}개 문서, {meta['dim']}차원)")
+
+
+class JsonlDocuments:
+    """오프셋 인덱스로 JSONL 파일에서 문서를 필요할 때만 읽어오는 시퀀스입니다."""
+
+    def __init__(self, docs_path, index_path):
+        self.docs_path = docs_path
+        self._offsets = np.load(index_path, mmap_mode="r")
+        self._file = open(docs_path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(docs_path) else b""
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        start, end = int(self._offsets[index]), int(self._offsets[index + 1])
+        return json.loads(self._mmap[start:end])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+def load_vector_store(prefix):
+    """벡터 저장소를 메모리 매핑으로 로드합니다. (documents, embeddings, meta)를 반환합니다."""
+    paths = _store_paths(prefix)
+    with open(paths["meta"], "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    embeddings = np.load(paths["vectors"], mmap_mode="r")
+    documents = JsonlDocuments(paths["docs"], paths["index"])
+    if len(documents) != meta["count"] or len(embeddings) != meta["count"]:
+        raise ValueError(f"벡터 저장소 '{prefix}'의 문서 수와 임베딩 수가 일치하지 않습니다.")
+    return documents, embeddings, meta
+
+
+class MmapVectorDB(SimpleVectorDB):
+    """메모리 매핑된 정규화 행렬을 복사하지 않고 그대로 검색에 사용하는 SimpleVectorDB입니다."""
+
+    def __init__(self, prefix, embeddings=None):
+        documents, matrix, meta = load_vector_store(prefix)
+        self.prefix = prefix
+        self.documents = documents
+        self.embeddings = embeddings
+        if not meta.get("normalized"):
+            # 정규화하지 않은 저장소(맛집 DB)는 load_restaurant_store()로 로드합니다.
+            # 여기서 정규화하면 읽기 전용 매핑 행렬 전체를 메모리로 복사하게 됩니다.
+            raise ValueError(f"벡터 저장소 '{prefix}'는 정규화되지 않아 MmapVectorDB로 로드할 수 없습니다.")
+        # doc_embeddings 설정자는 복사본을 정규화하므로 매핑 행렬을 직접 씁니다
+        self._matrix = matrix
+        self._metadata_index = load_metadata_index(prefix, len(documents))
+        if self._metadata_index is None:
+            # 역색인 파일이 없는 이전 저장소: 문서를 한 번 모두 읽어 만들고 다음 로드를 위해 저장
+            print(f"⚠️ 메타데이터 역색인이 없어 문서를 읽어 만듭니다: {prefix}")
+            self._build_metadata_index()
+            try:
+                save_metadata_index(prefix, self._metadata_index, len(documents))
+            except Exception as e:
+                print(f"⚠️ 메타데이터 역색인 저장 오류: {e}")
+
+    def __getstate__(self):
+        return {"prefix": self.prefix}
+
+    def __setstate__(self, state):
+        self.__init__(state["prefix"])
+
+
+def load_restaurant_store(prefix):
+    """맛집 벡터 저장소를 기존 {'chunks', 'embeddings'} 딕셔너리 형태로 로드합니다."""
+    documents, embeddings, meta = load_vector_store(prefix)
+    data = dict(meta.get("extra", {}))
+    data["chunks"] = documents
+    data["embeddings"] = embeddings
+    return data
+
+
+def convert_pickle_to_store(pkl_path, prefix=None):
+    """기존 SimpleVectorDB 피클 또는 맛집 {'chunks','embeddings'} 피클을 벡터 저장소로 변환합니다."""
+    prefix = prefix or get_store_prefix(pkl_path)
+    print(f"피클 변환 중: {pkl_path} → {prefix}.*")
+    with open(pkl_path, "rb") as f:
+        data = pickle.load(f)
+
+    if isinstance(data, dict) and "chunks" in data and "embeddings" in data:
+        # 맛집 DB는 정규화하지 않은 원본 내적 점수를 사용하므로 그대로 저장합니다
+        extra = {k: v for k, v in data.items() if k not in ("chunks", "embeddings") and isinstance(v, (str, int, float, bool))}
+        save_vector_store(prefix, list(data["chunks"]), data["embeddings"], normalize=False, extra=extra)
+    elif hasattr(data, "documents"):
+        sidecar_path = get_embeddings_sidecar_path(pkl_path)
+        if (data.doc_embeddings is None or len(data.doc_embeddings) == 0) and os.path.exists(sidecar_path):
+            data.doc_embeddings = np.load(sidecar_path)
+        if data.doc_embeddings is None or len(data.doc_embeddings) == 0:
+            raise ValueError(f"'{pkl_path}'에 문서 임베딩이 없습니다. load_vector_db()로 먼저 임베딩을 준비하세요.")
+        save_vector_store(prefix, list(data.documents), data.doc_embeddings, normalize=True)
+    else:
+        raise ValueError(f"지원하지 않는 벡터DB 형식입니다: {type(data).__name__}")
+    return prefix
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("사용법: python vector_store.py <피클 경로> [출력 prefix]")
+        sys.exit(1)
+    convert_pickle_to_store(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)